@@ -9,6 +9,28 @@ export const apiClient = axios.create({
   },
 })
 
+// Adjunta el token firmado del login (AuthContext guarda la respuesta en localStorage)
+apiClient.interceptors.request.use((config) => {
+  const savedUser = localStorage.getItem('user')
+  const token = savedUser ? JSON.parse(savedUser).token : undefined
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`
+  }
+  return config
+})
+
+// Token inválido o expirado: cerrar sesión y volver al login
+apiClient.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    if (error.response?.status === 401) {
+      localStorage.removeItem('user')
+      window.location.assign('/login')
+    }
+    return Promise.reject(error)
+  }
+)
+
 // Auth
 export const login = (email: string) => {
   return apiClient.post('/login/', { email })
@@ -41,6 +63,14 @@ export const updateSubTask = (subtaskId: number, data: {
   return apiClient.patch(`/subtasks/${subtaskId}/`, data)
 }
 
+export const updateSubTasks = (taskId: number, operations: {
+  id: number
+  title?: string
+  is_completed?: boolean
+}[]) => {
+  return apiClient.patch(`/tasks/${taskId}/subtasks/`, operations)
+}
+
 export const deleteSubTask = (subtaskId: number) => {
   return apiClient.delete(`/subtasks/${subtaskId}/`)
 }
@@ -2,6 +2,7 @@ export interface User {
   id: number
   email: string
   username: string
+  token?: string
 }
 
 export interface SubTask {
@@ -25,10 +26,13 @@ export interface Task {
   subtasks?: SubTask[]
   subtasks_count?: number
   completed_subtasks_count?: number
+  // Solo en tareas archivadas (?include_archived=true), que son de solo lectura
+  archived_at?: string
 }
 
 export interface LoginResponse {
   id: number
   email: string
   username: string
+  token: string
 }
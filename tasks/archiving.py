@@ -0,0 +1,47 @@
+"""
+Move completed tasks (and their subtasks) from the hot tables to the archive.
+
+A separate archive table is used instead of native PostgreSQL partitioning:
+subtasks reference tasks by id, and a foreign key to a partitioned table
+would need the partition key (status) in the primary key.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task, SubTasks, ArchivedTask, ArchivedSubTask
+
+
+TASK_COLUMNS = ['id', 'user_id', 'title', 'description', 'status', 'category', 'created_at', 'updated_at']
+SUBTASK_COLUMNS = ['id', 'task_id', 'title', 'is_completed', 'created_at', 'updated_at']
+
+
+def archivable_tasks(cutoff):
+    """Completed tasks not updated since cutoff"""
+    return Task.objects.filter(status='is_completed', updated_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size):
+    """Archive up to batch_size tasks in one transaction. Returns how many were moved."""
+    with transaction.atomic():
+        ids = list(
+            archivable_tasks(cutoff).order_by('id').select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            # INSERT ... SELECT: las filas no pasan por Python
+            cursor.execute(
+                f"INSERT INTO {ArchivedTask._meta.db_table} ({', '.join(TASK_COLUMNS)}, archived_at) "
+                f"SELECT {', '.join(TASK_COLUMNS)}, %s FROM {Task._meta.db_table} WHERE id IN ({placeholders})",
+                [timezone.now(), *ids]
+            )
+            cursor.execute(
+                f"INSERT INTO {ArchivedSubTask._meta.db_table} ({', '.join(SUBTASK_COLUMNS)}) "
+                f"SELECT {', '.join(SUBTASK_COLUMNS)} FROM {SubTasks._meta.db_table} WHERE task_id IN ({placeholders})",
+                ids
+            )
+        Task.objects.filter(id__in=ids).delete()
+    return len(ids)
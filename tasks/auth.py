@@ -0,0 +1,154 @@
+"""
+Stateless login tokens and cached user profiles.
+
+``login`` issues a signed token (django.core.signing) that carries the user id,
+so requests can be attributed to a user without touching the database. User
+profile data shown in ``user_info`` is cached in two tiers: a small in-process
+dict with a short TTL and the Django cache. Both are invalidated from the
+User post_save/post_delete signals, but only in the process that saved the user.
+
+With a shared Django cache (Redis, Memcached) other processes see changes once
+their local TTL (USER_PROFILE_LOCAL_TTL) expires. The default LocMemCache is
+per process too, so while it is in use the Django cache timeout is capped to the
+local TTL; run several workers with a shared backend to get the longer timeout.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+TOKEN_SALT = 'tasks.auth.token'
+PROFILE_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name']
+
+
+def issue_token(user_id):
+    """Signed token carrying the user id"""
+    return signing.dumps({'uid': user_id}, salt=TOKEN_SALT)
+
+
+def get_token_user_id(request):
+    """User id from 'Authorization: Bearer <token>', or None if no token was sent.
+
+    Raises signing.BadSignature (or SignatureExpired) if the token is not valid.
+    """
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    max_age = getattr(settings, 'AUTH_TOKEN_MAX_AGE', 60 * 60 * 24 * 7)
+    return signing.loads(header[len('Bearer '):], salt=TOKEN_SALT, max_age=max_age)['uid']
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with a TTL per entry"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_profiles = LocalCache(
+    max_entries=getattr(settings, 'USER_PROFILE_LOCAL_MAX_ENTRIES', 10000),
+    ttl=getattr(settings, 'USER_PROFILE_LOCAL_TTL', 30),
+)
+
+
+def profile_key(user_id):
+    return f'tasks:user_profile:{user_id}'
+
+
+def email_key(email):
+    return f'tasks:user_email:{email}'
+
+
+def profile_from_user(user):
+    return {field: getattr(user, field) for field in PROFILE_FIELDS}
+
+
+def shared_timeout():
+    """Django cache timeout for profiles, capped to the local TTL if the cache is per process"""
+    timeout = getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 300)
+    if isinstance(caches['default'], LocMemCache):
+        return min(timeout, local_profiles.ttl)
+    return timeout
+
+
+def cache_profile(profile):
+    timeout = shared_timeout()
+    local_profiles.set(profile['id'], profile)
+    cache.set_many({profile_key(profile['id']): profile, email_key(profile['email']): profile['id']}, timeout)
+
+
+def get_user_profile(user_id):
+    """Profile dict for user_id (local cache, shared cache, then DB). None if missing."""
+    user_id = int(user_id)
+    profile = local_profiles.get(user_id)
+    if profile is not None:
+        return profile
+
+    profile = cache.get(profile_key(user_id))
+    if profile is None:
+        user = User.objects.filter(id=user_id).only(*PROFILE_FIELDS).first()
+        if user is None:
+            return None
+        profile = profile_from_user(user)
+        cache_profile(profile)
+    else:
+        local_profiles.set(user_id, profile)
+    return profile
+
+
+def get_profile_by_email(email):
+    """Profile dict for the user with this email, or None"""
+    user_id = cache.get(email_key(email))
+    if user_id is not None:
+        profile = get_user_profile(user_id)
+        # El email pudo cambiar desde que se cacheo la clave
+        if profile is not None and profile['email'] == email:
+            return profile
+
+    user = User.objects.filter(email=email).only(*PROFILE_FIELDS).first()
+    if user is None:
+        return None
+    profile = profile_from_user(user)
+    cache_profile(profile)
+    return profile
+
+
+def invalidate_user_profile(user_id):
+    local_profiles.delete(user_id)
+    cache.delete(profile_key(user_id))
@@ -0,0 +1,138 @@
+"""
+NDJSON bulk import of tasks with their subtasks.
+
+Lines are read from the request stream one at a time and validated with
+TaskImportSerializer. Valid tasks are inserted every ``batch_size`` lines with
+bulk_create in one transaction per batch, so memory depends on the batch size,
+not on the upload size. bulk_create does not send post_save, so no subtasks are
+generated. Tasks imported without subtasks are either left as they are
+(ai=skip) or queued in PendingSubtaskGeneration (ai=defer) for the
+generate_subtasks command.
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Task, SubTasks, PendingSubtaskGeneration
+from .serielizers import TaskImportSerializer
+
+
+AI_MODES = ('defer', 'skip')
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_lines(stream, max_bytes=MAX_LINE_BYTES):
+    """Yield the lines of a byte stream; lines longer than max_bytes are yielded as None"""
+    while True:
+        line = stream.readline(max_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_bytes and not line.endswith(b'\n'):
+            # Descartar el resto de la línea
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_bytes)
+            yield None
+        else:
+            yield line
+
+
+class ImportSummary:
+    """Counts and per-line errors of an import (errors capped at MAX_REPORTED_ERRORS)"""
+
+    def __init__(self):
+        self.imported = 0
+        self.deferred = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'deferred': self.deferred,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda e: e['line']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_ndjson(stream, ai='defer', batch_size=DEFAULT_BATCH_SIZE, user_id=None):
+    """Import tasks from an NDJSON byte stream. If user_id is given, every line must belong to it."""
+    summary = ImportSummary()
+    batch = []
+    for line_number, line in enumerate(iter_lines(stream), start=1):
+        if line is None:
+            summary.error(line_number, {'line': [f"La línea supera {MAX_LINE_BYTES} bytes"]})
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            summary.error(line_number, {'line': [f"JSON inválido: {e}"]})
+            continue
+
+        if user_id is not None and isinstance(data, dict):
+            if str(data.setdefault('user', user_id)) != str(user_id):
+                summary.error(line_number, {'user': ["No tienes permiso para importar tareas de otro usuario"]})
+                continue
+
+        serializer = TaskImportSerializer(data=data)
+        if not serializer.is_valid():
+            summary.error(line_number, serializer.errors)
+            continue
+
+        batch.append((line_number, serializer.validated_data))
+        if len(batch) >= batch_size:
+            save_batch(batch, ai, summary)
+            batch = []
+
+    if batch:
+        save_batch(batch, ai, summary)
+    return summary.as_dict()
+
+
+def save_batch(batch, ai, summary):
+    user_ids = {data['user'] for _, data in batch}
+    existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+    valid = []
+    for line_number, data in batch:
+        if data['user'] in existing:
+            valid.append(data)
+        else:
+            summary.error(line_number, {'user': [f"El usuario {data['user']} no existe"]})
+    if not valid:
+        return
+
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(
+                user_id=data['user'],
+                title=data['title'],
+                description=data['description'],
+                status=data['status'],
+                category=data['category'],
+            )
+            for data in valid
+        ])
+        SubTasks.objects.bulk_create([
+            SubTasks(task_id=task.id, **subtask)
+            for task, data in zip(tasks, valid)
+            for subtask in data.get('subtasks', [])
+        ])
+        if ai == 'defer':
+            pending = [PendingSubtaskGeneration(task_id=task.id) for task, data in zip(tasks, valid) if not data.get('subtasks')]
+            PendingSubtaskGeneration.objects.bulk_create(pending)
+            summary.deferred += len(pending)
+
+    summary.imported += len(tasks)
@@ -0,0 +1,108 @@
+"""
+Negotiated response compression (zstd, gzip).
+
+Only API payloads (JSON and NDJSON) are compressed. HTML pages such as the admin
+and the DRF browsable API carry CSRF tokens, and compressing them without length
+padding would expose those tokens to BREACH.
+
+Buffered responses are compressed when their body reaches COMPRESSION_MIN_SIZE.
+Streaming responses are always compressed, chunk by chunk. zstd is offered only
+if the ``zstandard`` package is installed.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Sin text/*: ver BREACH en el docstring del módulo
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson')
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header, without those with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    for encoding in getattr(settings, 'COMPRESSION_ENCODINGS', ['zstd', 'gzip']):
+        if encoding == 'zstd' and zstandard is None:
+            continue
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def compress(encoding, content):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(encoding, chunks):
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    """Compress JSON/NDJSON responses with the best encoding the client accepts"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header('Content-Encoding') or response.status_code == 206:
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(encoding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.archiving import archivable_tasks, archive_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed tasks not updated for --older-than days to the archive tables, in small "
+        "transactions. Safe to run repeatedly (cron) and to migrate existing data incrementally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=30, help='Days since last update')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--limit', type=int, help='Stop after archiving this many tasks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count archivable tasks')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{archivable_tasks(cutoff).count()} tasks would be archived")
+            return
+
+        archived = 0
+        started = time.perf_counter()
+        while options['limit'] is None or archived < options['limit']:
+            batch_size = options['batch_size']
+            if options['limit'] is not None:
+                batch_size = min(batch_size, options['limit'] - archived)
+            moved = archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            archived += moved
+            self.stdout.write(f"Archived {archived} tasks...")
+
+        elapsed = time.perf_counter() - started
+        rate = archived / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} tasks in {elapsed:.1f}s ({rate:.0f} tasks/s)"))
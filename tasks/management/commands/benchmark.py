@@ -0,0 +1,266 @@
+import gc
+import json
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from tasks.models import Task, SubTasks
+
+
+SCENARIOS = ['login', 'list', 'detail', 'create', 'toggle']
+
+# Metricas comparadas contra el baseline (mayor = peor)
+COMPARED_METRICS = ['p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request', 'peak_memory_kb']
+# Metricas comparadas contra el baseline (menor = peor)
+COMPARED_HIGHER_IS_BETTER = ['throughput_rps']
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Throwaway test database with the fake subtask generator"""
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        with override_settings(SUBTASK_GENERATOR='fake'):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a reproducible performance benchmark of the task API against a throwaway "
+        "test database, with the LLM replaced by a deterministic fake."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tasks-per-user', type=int, default=50)
+        parser.add_argument('--subtasks-per-task', type=int, default=5)
+        parser.add_argument('--iterations', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument(
+            '--memory-iterations', type=int, default=10,
+            help='Requests per scenario traced with tracemalloc for peak memory'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--baseline', help='Compare results against this JSON file')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed relative regression vs baseline (0.2 = 20%%)'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the benchmark database')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+
+        with benchmark_database(options['keepdb']):
+            self.seed(options)
+            results = {
+                'meta': self.meta(options),
+                'scenarios': {
+                    name: self.run_scenario(name, options) for name in options['scenarios']
+                },
+            }
+
+        self.report(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results saved to {options['output']}")
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    # ==================== DATA ====================
+
+    def seed(self, options):
+        """Create users x tasks x subtasks with bulk inserts (no signals, no LLM)"""
+        Task.objects.all().delete()
+        User.objects.filter(username__startswith='bench_').delete()
+
+        User.objects.bulk_create([
+            User(username=f'bench_{i}', email=f'bench_{i}@example.com')
+            for i in range(options['users'])
+        ])
+        self.users = list(User.objects.filter(username__startswith='bench_').order_by('id'))
+
+        categories = ['work', 'personal', 'urgent']
+        statuses = ['pending', 'is_completed']
+        Task.objects.bulk_create([
+            Task(
+                user=user,
+                title=f'Task {n} of {user.username}',
+                description=f'Benchmark task {n} with a reasonably sized description text.',
+                status=self.random.choice(statuses),
+                category=self.random.choice(categories),
+            )
+            for user in self.users
+            for n in range(options['tasks_per_user'])
+        ], batch_size=1000)
+        self.task_ids = list(Task.objects.values_list('id', flat=True))
+
+        SubTasks.objects.bulk_create([
+            SubTasks(task_id=task_id, title=f'Subtask {n}', is_completed=self.random.random() < 0.5)
+            for task_id in self.task_ids
+            for n in range(options['subtasks_per_task'])
+        ], batch_size=1000)
+        self.subtask_ids = list(SubTasks.objects.values_list('id', flat=True))
+
+    def meta(self, options):
+        return {
+            'users': options['users'],
+            'tasks_per_user': options['tasks_per_user'],
+            'subtasks_per_task': options['subtasks_per_task'],
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+        }
+
+    # ==================== SCENARIOS ====================
+
+    def request_for(self, name, client):
+        """Return a zero-argument callable performing one request of the scenario"""
+        user = self.random.choice(self.users)
+
+        if name == 'login':
+            return lambda: client.post(
+                '/api/login/', {'email': user.email}, content_type='application/json'
+            )
+        if name == 'list':
+            return lambda: client.get('/api/tasks/', {'user_id': user.id})
+        if name == 'detail':
+            task_id = self.random.choice(self.task_ids)
+            return lambda: client.get(f'/api/tasks/{task_id}/')
+        if name == 'create':
+            payload = {
+                'user': user.id,
+                'title': f'Benchmark task {self.random.randint(0, 10 ** 6)}',
+                'description': 'Created by the benchmark command to measure task creation.',
+                'status': 'pending',
+                'category': 'work',
+            }
+            return lambda: client.post('/api/tasks/', payload, content_type='application/json')
+        if name == 'toggle':
+            subtask_id = self.random.choice(self.subtask_ids)
+            payload = {'is_completed': self.random.random() < 0.5}
+            return lambda: client.patch(
+                f'/api/subtasks/{subtask_id}/', payload, content_type='application/json'
+            )
+        raise CommandError(f"Unknown scenario: {name}")
+
+    def run_scenario(self, name, options):
+        client = Client()
+
+        for _ in range(options['warmup']):
+            self.request_for(name, client)()
+
+        latencies = []
+        queries = 0
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(options['iterations']):
+            do_request = self.request_for(name, client)
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                response = do_request()
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                latencies.append((time.perf_counter() - t0) * 1000)
+            queries += len(ctx.captured_queries)
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: unexpected HTTP {response.status_code}")
+        elapsed = time.perf_counter() - started
+
+        # tracemalloc slows allocations down, so peak memory gets its own pass
+        gc.collect()
+        tracemalloc.start()
+        for _ in range(options['memory_iterations']):
+            response = self.request_for(name, client)()
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        iterations = options['iterations']
+        return {
+            'iterations': iterations,
+            'throughput_rps': round(iterations / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'queries_per_request': round(queries / iterations, 2) if iterations else 0.0,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    # ==================== REPORTING ====================
+
+    def report(self, results):
+        header = f"{'scenario':<10} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KB':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, m in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<10} {m['throughput_rps']:>9} {m['p50_ms']:>9} {m['p95_ms']:>9} "
+                f"{m['p99_ms']:>9} {m['queries_per_request']:>8} {m['peak_memory_kb']:>10}"
+            )
+
+    def compare(self, results, baseline_path, tolerance):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f"Could not read baseline {baseline_path}: {e}")
+
+        regressions = []
+        for name, current in results['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if not previous:
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = previous.get(metric), current.get(metric)
+                if before is None or after is None:
+                    continue
+                if after > before * (1 + tolerance):
+                    regressions.append(f"{name}.{metric}: {before} -> {after}")
+            for metric in COMPARED_HIGHER_IS_BETTER:
+                before, after = previous.get(metric), current.get(metric)
+                if before is None or after is None:
+                    continue
+                if after < before * (1 - tolerance):
+                    regressions.append(f"{name}.{metric}: {before} -> {after}")
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(f"REGRESSION {line}")
+            raise CommandError(
+                f"{len(regressions)} metric(s) regressed more than {tolerance:.0%} vs {baseline_path}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions vs {baseline_path} (tolerance {tolerance:.0%})"))
@@ -0,0 +1,103 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils import timezone
+
+from tasks.archiving import archive_batch
+from tasks.models import Task, SubTasks
+
+from .benchmark import benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large tasks table (mostly completed), then measure task_list latency before and "
+        "after archiving, archive throughput, and ?include_archived=true. "
+        "Use --tasks 10000000 against PostgreSQL for the 10M row scenario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--completed-ratio', type=float, default=0.8)
+        parser.add_argument('--subtasks-per-task', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--samples', type=int, default=20, help='List requests per measurement')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options)
+            self.stdout.write(f"{Task.objects.count()} tasks, {SubTasks.objects.count()} subtasks")
+
+            self.report('list before', self.measure_list(options, ''))
+
+            started = time.perf_counter()
+            archived = 0
+            while True:
+                moved = archive_batch(timezone.now(), options['batch_size'])
+                if not moved:
+                    break
+                archived += moved
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"archived {archived} tasks in {elapsed:.1f}s ({archived / elapsed:.0f} tasks/s)")
+
+            self.report('list after', self.measure_list(options, ''))
+            self.report('include_archived', self.measure_list(options, 'true'))
+
+    def seed(self, options):
+        User.objects.bulk_create([
+            User(username=f'bench_archive_{i}', email=f'bench_archive_{i}@example.com')
+            for i in range(options['users'])
+        ])
+        self.user_ids = list(User.objects.filter(username__startswith='bench_archive_').values_list('id', flat=True))
+
+        completed_every = max(1, round(1 / (1 - options['completed_ratio']))) if options['completed_ratio'] < 1 else 0
+        batch = []
+        for n in range(options['tasks']):
+            # Reparte las pendientes entre todos los usuarios
+            pending = completed_every and (n // len(self.user_ids)) % completed_every == 0
+            batch.append(Task(
+                user_id=self.user_ids[n % len(self.user_ids)],
+                title=f'Task {n}',
+                description='Benchmark task for the archive tier.',
+                status='pending' if pending else 'is_completed',
+            ))
+            if len(batch) == 10000:
+                self.flush(batch, options)
+                batch = []
+        if batch:
+            self.flush(batch, options)
+        # auto_now no aplica en update(): marcamos las completadas como antiguas
+        Task.objects.filter(status='is_completed').update(updated_at=timezone.now() - timedelta(days=365))
+
+    def flush(self, tasks, options):
+        created = Task.objects.bulk_create(tasks)
+        SubTasks.objects.bulk_create([
+            SubTasks(task_id=task.id, title=f'Subtask {n}', is_completed=True)
+            for task in created
+            for n in range(options['subtasks_per_task'])
+        ], batch_size=10000)
+
+    def measure_list(self, options, include_archived):
+        client = Client()
+        latencies = []
+        for i in range(options['samples']):
+            params = {'user_id': self.user_ids[i % len(self.user_ids)]}
+            if include_archived:
+                params['include_archived'] = include_archived
+            started = time.perf_counter()
+            response = client.get('/api/tasks/', params)
+            size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming else len(response.content)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies, size
+
+    def report(self, label, measurement):
+        latencies, size = measurement
+        self.stdout.write(
+            f"{label:<18} median {statistics.median(latencies):8.2f} ms   max {max(latencies):8.2f} ms   "
+            f"last body {size} bytes"
+        )
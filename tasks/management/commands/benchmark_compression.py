@@ -0,0 +1,81 @@
+import gc
+import resource
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from tasks import compression
+from tasks.models import Task, SubTasks
+from tasks.serielizers import TaskSerializer
+
+from .benchmark import benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bytes on the wire, time and peak memory of the task list for a large user, "
+        "streamed with each negotiated encoding vs the previous fully buffered response."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--subtasks-per-task', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create(username='bench_compression', email='bench_compression@example.com')
+            Task.objects.bulk_create([
+                Task(
+                    user=user,
+                    title=f'Task {n}',
+                    description=f'Benchmark task {n}: ' + 'a fairly typical description sentence. ' * 5,
+                )
+                for n in range(options['tasks'])
+            ], batch_size=2000)
+            SubTasks.objects.bulk_create([
+                SubTasks(task_id=task_id, title=f'Subtask {n}')
+                for task_id in Task.objects.values_list('id', flat=True)
+                for n in range(options['subtasks_per_task'])
+            ], batch_size=2000)
+
+            self.stdout.write(f"{options['tasks']} tasks x {options['subtasks_per_task']} subtasks")
+            self.stdout.write(f"{'mode':<16} {'bytes':>12} {'ratio':>7} {'seconds':>8} {'peak MB':>8}")
+
+            raw_size = None
+            for label, run in [('buffered (old)', lambda: self.buffered(user))] + [
+                (f'stream {encoding}', lambda encoding=encoding: self.streamed(user, encoding))
+                for encoding in ('identity', 'gzip', 'zstd')
+                if encoding != 'zstd' or compression.zstandard is not None
+            ]:
+                size, seconds, peak = self.measure(run)
+                raw_size = raw_size or size
+                self.stdout.write(
+                    f"{label:<16} {size:>12} {size / raw_size:>7.2f} {seconds:>8.2f} {peak / 2 ** 20:>8.1f}"
+                )
+
+        self.stdout.write(
+            f"peak MB = traced Python allocations; process max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        )
+
+    def measure(self, run):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = run()
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size, seconds, peak
+
+    def buffered(self, user):
+        """The previous implementation: serialize everything, then render at once"""
+        data = TaskSerializer(Task.objects.filter(user=user), many=True).data
+        return len(JSONRenderer().render(data))
+
+    def streamed(self, user, encoding):
+        response = Client().get('/api/tasks/', {'user_id': user.id}, HTTP_ACCEPT_ENCODING=encoding)
+        return sum(len(chunk) for chunk in response.streaming_content)
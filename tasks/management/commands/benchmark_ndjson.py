@@ -0,0 +1,88 @@
+import gc
+import json
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from tasks.bulk import import_ndjson
+
+from .benchmark import benchmark_database
+
+
+class GeneratedStream:
+    """Read-only byte stream producing NDJSON lines on demand (nothing is kept in memory)"""
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.bytes_read = 0
+
+    def readline(self, size=-1):
+        line = next(self.lines, b'')
+        self.bytes_read += len(line)
+        return line
+
+
+class Command(BaseCommand):
+    help = (
+        "Import N generated tasks through the NDJSON importer and export them back through "
+        "GET /api/tasks/export/, reporting throughput and peak traced memory (timings include "
+        "tracemalloc overhead). "
+        "Use --tasks 1000000 for the million-task scenario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--subtasks-per-task', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create(username='bench_ndjson', email='bench_ndjson@example.com')
+
+            def lines():
+                for n in range(options['tasks']):
+                    yield json.dumps({
+                        'user': user.id,
+                        'title': f'Imported task {n}',
+                        'description': 'Task generated by the NDJSON benchmark.',
+                        'subtasks': [
+                            {'title': f'Step {i}', 'is_completed': i % 2 == 0}
+                            for i in range(options['subtasks_per_task'])
+                        ],
+                    }).encode('utf-8') + b'\n'
+
+            stream = GeneratedStream(lines())
+            summary, seconds, peak = self.measure(
+                lambda: import_ndjson(stream, ai='skip', batch_size=options['batch_size'])
+            )
+            self.stdout.write(
+                f"import: {summary['imported']} tasks ({stream.bytes_read / 2 ** 20:.1f} MB) in {seconds:.1f}s, "
+                f"{summary['imported'] / seconds:.0f} tasks/s, peak {peak / 2 ** 20:.1f} MB, {summary['failed']} failed"
+            )
+
+            def export():
+                response = Client().get('/api/tasks/export/', {'user_id': user.id}, HTTP_ACCEPT_ENCODING='identity')
+                size = lines_out = 0
+                for chunk in response.streaming_content:
+                    size += len(chunk)
+                    lines_out += chunk.count(b'\n')
+                return size, lines_out
+
+            (size, lines_out), seconds, peak = self.measure(export)
+            self.stdout.write(
+                f"export: {lines_out} tasks ({size / 2 ** 20:.1f} MB) in {seconds:.1f}s, "
+                f"{lines_out / seconds:.0f} tasks/s, peak {peak / 2 ** 20:.1f} MB"
+            )
+
+    def measure(self, run):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, seconds, peak
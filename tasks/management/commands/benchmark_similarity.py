@@ -0,0 +1,99 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.similarity import SimilarityIndex, adapt_subtasks, embed
+
+
+# Plantillas de tareas casi duplicadas: mismo trabajo con distinto periodo/nombre/producto.
+# Cada una trae sus subtareas de referencia (lo que esperariamos del LLM), escritas a
+# mano y no derivadas del titulo, para medir la calidad de las subtareas reutilizadas.
+TEMPLATES = [
+    ('Prepare {period} report', 'Compile the {period} financial report for the board meeting',
+     ['Collect {period} figures', 'Draft the report', 'Review numbers with finance', 'Send it to the board']),
+    ('Plan {period} marketing campaign', 'Define channels, budget and goals for the {period} campaign',
+     ['Set {period} campaign goals', 'Choose channels', 'Agree on the budget', 'Schedule the launch']),
+    ('Review {product} pull requests', 'Go through the open pull requests of the {product} repository',
+     ['List open {product} pull requests', 'Run the test suite', 'Leave review comments', 'Merge approved changes']),
+    ('Release {product} version {n}', 'Tag, build and publish version {n} of {product}',
+     ['Update the {product} changelog', 'Tag version {n}', 'Build the artifacts', 'Publish version {n}']),
+    ('Onboard {name}', 'Set up accounts, laptop and first week agenda for {name}',
+     ['Create accounts for {name}', 'Prepare the laptop', 'Plan the first week agenda']),
+    ('Call {name} about the contract', 'Discuss the renewal terms of the contract with {name}',
+     ['Review the current contract', 'Prepare renewal terms', 'Schedule the call with {name}', 'Send a summary to {name}']),
+    ('Book flights to {city}', 'Find and book flights and hotel for the trip to {city}',
+     ['Compare flights to {city}', 'Book the hotel in {city}', 'Confirm the itinerary']),
+    ('Organize {name} birthday party', 'Choose venue, invite guests and order cake for {name}',
+     ['Choose a venue', 'Invite guests', 'Order the cake for {name}', 'Buy decorations']),
+    ('Fix login bug in {product}', 'Users of {product} cannot log in after resetting their password',
+     ['Reproduce the {product} login bug', 'Find the root cause', 'Write a regression test', 'Deploy the fix']),
+    ('Write blog post about {product}', 'Draft, review and publish an article presenting {product}',
+     ['Outline the {product} post', 'Write the draft', 'Get a review', 'Publish the post']),
+]
+SLOTS = {
+    'period': ['Q1', 'Q2', 'Q3', 'Q4', 'January', 'March', 'annual'],
+    'product': ['billing', 'mobile app', 'dashboard', 'api', 'website'],
+    'name': ['Ana', 'Luis', 'Marta', 'Pedro', 'Sofia', 'Diego'],
+    'city': ['Madrid', 'Santiago', 'Lima', 'Bogota', 'Paris'],
+    'n': ['1.2', '2.0', '3.1', '4.0'],
+}
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline benchmark of the subtask similarity cache: hit rate (LLM calls saved) and "
+        "quality of reused subtasks vs hand-written reference ones, per similarity threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--thresholds', default='0.6,0.7,0.8,0.85,0.9,0.95')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        corpus, templates, reference = [], [], []
+        for _ in range(options['tasks']):
+            template = rng.randrange(len(TEMPLATES))
+            title, description, subtasks = TEMPLATES[template]
+            values = {slot: rng.choice(choices) for slot, choices in SLOTS.items()}
+            corpus.append((title.format(**values), description.format(**values)))
+            templates.append(template)
+            # Las subtareas de referencia hacen de "LLM" en los fallos y de patron de calidad en los aciertos
+            reference.append([subtask.format(**values) for subtask in subtasks])
+        vectors = [embed(t, d) for t, d in corpus]
+
+        self.stdout.write(f"{'threshold':>9} {'hit rate':>9} {'precision':>9} {'quality':>8} {'search ms':>10}")
+        for threshold in [float(t) for t in options['thresholds'].split(',')]:
+            index = SimilarityIndex()
+            produced = []
+            hits, same_template, quality, search_time = 0, 0, 0.0, 0.0
+            for i, (title, _) in enumerate(corpus):
+                started = time.perf_counter()
+                match = index.search(vectors[i])
+                search_time += time.perf_counter() - started
+                if match is not None and match[2] >= threshold:
+                    neighbour, neighbour_title, _ = match
+                    subtasks = adapt_subtasks(neighbour_title, title, produced[neighbour])
+                    hits += 1
+                    same_template += templates[neighbour] == templates[i]
+                    quality += jaccard(subtasks, reference[i])
+                else:
+                    subtasks = reference[i]
+                produced.append(subtasks)
+                index.add(i, title, vectors[i])
+
+            self.stdout.write(
+                f"{threshold:>9} {hits / len(corpus):>9.1%} {(same_template / hits if hits else 1.0):>9.1%} "
+                f"{(quality / hits if hits else 1.0):>8.3f} {search_time / len(corpus) * 1000:>10.3f}"
+            )
+        self.stdout.write(
+            "precision = hits whose neighbour comes from the same template; quality = mean Jaccard "
+            "similarity of reused vs reference subtask titles (hits only)"
+        )
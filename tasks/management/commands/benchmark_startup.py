@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.services import LLM_MODULES
+
+
+# Simula el comportamiento anterior: el stack de IA cargado al importar tasks.signals
+EAGER_PRELOAD = "import langchain_google_genai, langchain_core.prompts; "
+
+TARGETS = {
+    'check': "import sys, runpy; sys.argv = ['manage.py', 'check']; runpy.run_path('manage.py', run_name='__main__')",
+    'wsgi': "from pair_programming.wsgi import application",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start time and peak RSS of 'manage.py check' and WSGI boot, "
+        "with the AI stack loaded lazily (current) vs eagerly (previous behaviour)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+
+        self.stdout.write(f"{'target':<8} {'mode':<6} {'median s':>9} {'max RSS MB':>11}  AI stack loaded")
+        for name, code in TARGETS.items():
+            results = {}
+            for mode, prefix in (('lazy', ''), ('eager', EAGER_PRELOAD)):
+                script = prefix + code + f"; import sys; print(any(m in sys.modules for m in {LLM_MODULES!r}))"
+                times, rss = [], []
+                for _ in range(options['repeat']):
+                    elapsed, max_rss_kb, loaded = self.run_once(script, env)
+                    times.append(elapsed)
+                    rss.append(max_rss_kb / 1024)
+                results[mode] = (statistics.median(times), statistics.median(rss))
+                self.stdout.write(
+                    f"{name:<8} {mode:<6} {results[mode][0]:>9.3f} {results[mode][1]:>11.1f}  {loaded}"
+                )
+            lazy, eager = results['lazy'], results['eager']
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {eager[0] - lazy[0]:+.3f} s and {eager[1] - lazy[1]:+.1f} MB saved by lazy loading"
+            ))
+
+    def run_once(self, script, env):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        output = process.stdout.read()
+        _, _, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+        process.stdout.close()
+        # ru_maxrss esta en KB en Linux
+        return elapsed, usage.ru_maxrss, output.strip().splitlines()[-1:] == ['True']
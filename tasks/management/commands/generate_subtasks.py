@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import PendingSubtaskGeneration
+from tasks.signals import populate_subtasks
+
+
+class Command(BaseCommand):
+    help = "Generate AI subtasks for imported tasks whose generation was deferred (ai=defer)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--limit', type=int, help='Stop after this many tasks')
+
+    def handle(self, *args, **options):
+        # Las tareas que fallan siguen en la cola para la próxima ejecución
+        done = failed = 0
+        last_id = 0
+        while options['limit'] is None or done + failed < options['limit']:
+            size = options['batch_size']
+            if options['limit'] is not None:
+                size = min(size, options['limit'] - done - failed)
+            pending = list(
+                PendingSubtaskGeneration.objects.select_related('task')
+                .filter(task_id__gt=last_id).order_by('task_id')[:size]
+            )
+            if not pending:
+                break
+            # delete() deja task_id a None: guardar antes el cursor
+            last_id = pending[-1].task_id
+            for entry in pending:
+                if populate_subtasks(entry.task, raise_on_error=True):
+                    entry.delete()
+                    done += 1
+                else:
+                    failed += 1
+            self.stdout.write(f"Generated subtasks for {done} tasks ({failed} failed)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {done} tasks processed, {failed} failed and left in the queue"))
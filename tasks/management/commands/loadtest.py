@@ -0,0 +1,277 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark import percentile
+
+
+# Acciones del dashboard (frontend/src/pages/Dashboard.tsx). Cada mutacion invalida
+# la query ['tasks', user.id], asi que el frontend vuelve a pedir el listado.
+ACTIONS = ['login', 'list', 'create', 'toggle', 'delete']
+DEFAULT_MIX = 'login=5,list=40,create=15,toggle=30,delete=10'
+
+
+def parse_mix(value):
+    """Parse 'list=40,create=15,...' into {action: weight}"""
+    mix = {}
+    for part in value.split(','):
+        try:
+            action, weight = part.split('=')
+            weight = float(weight)
+        except ValueError:
+            raise CommandError(f"Invalid mix entry: {part!r} (expected action=weight)")
+        if action not in ACTIONS:
+            raise CommandError(f"Unknown action {action!r}; choose from {', '.join(ACTIONS)}")
+        mix[action] = weight
+    if not any(mix.values()):
+        raise CommandError("The traffic mix needs at least one positive weight")
+    return mix
+
+
+def summarize(samples, seconds):
+    latencies = [s['latency_ms'] for s in samples]
+    errors = sum(1 for s in samples if not s['ok'])
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2) if seconds else 0.0,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+class Recorder:
+    """Thread-safe buffer of request samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def record(self, endpoint, latency_ms, ok):
+        with self.lock:
+            self.pending.append({'endpoint': endpoint, 'latency_ms': latency_ms, 'ok': ok, 'at': time.monotonic()})
+
+    def drain(self):
+        with self.lock:
+            samples, self.pending = self.pending, []
+        return samples
+
+
+class VirtualUser(threading.Thread):
+    """Replays the dashboard call pattern from frontend/src/api/client.ts"""
+
+    def __init__(self, base_url, email, mix, think_time, recorder, stop_event, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.actions = list(mix.keys())
+        self.weights = list(mix.values())
+        self.think_time = think_time
+        self.recorder = recorder
+        self.stop_event = stop_event
+        self.random = random.Random(seed)
+        self.user_id = None
+        self.token = None
+        self.tasks = []
+
+    def call(self, endpoint, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            # Como el interceptor de client.ts tras el login
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                payload = response.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            payload, ok = b'', False
+        self.recorder.record(endpoint, (time.perf_counter() - started) * 1000, ok)
+        if not ok or not payload:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    # ==================== ACTIONS ====================
+
+    def login(self):
+        data = self.call('login', 'POST', '/login/', {'email': self.email})
+        if data:
+            self.user_id = data['id']
+            self.token = data.get('token')
+
+    def list(self):
+        data = self.call('list', 'GET', f'/tasks/?user_id={self.user_id}')
+        if isinstance(data, dict):
+            data = data.get('tasks', [])
+        if isinstance(data, list):
+            self.tasks = data
+
+    def create(self):
+        self.call('create', 'POST', '/tasks/', {
+            'user': self.user_id,
+            'title': f'Load test task {self.random.randint(0, 10 ** 6)}',
+            'description': 'Task created by the load generator to mimic dashboard usage.',
+            'status': 'pending',
+            'category': self.random.choice(['work', 'personal', 'urgent']),
+        })
+        self.list()
+
+    def toggle(self):
+        subtasks = [s for task in self.tasks for s in task.get('subtasks', [])]
+        if not subtasks:
+            return self.create()
+        subtask = self.random.choice(subtasks)
+        self.call('toggle', 'PATCH', f"/subtasks/{subtask['id']}/", {'is_completed': not subtask['is_completed']})
+        self.list()
+
+    def delete(self):
+        if not self.tasks:
+            return self.create()
+        task = self.tasks.pop(self.random.randrange(len(self.tasks)))
+        self.call('delete', 'DELETE', f"/tasks/{task['id']}/")
+        self.list()
+
+    def run(self):
+        self.login()
+        if self.user_id is None:
+            return
+        self.list()
+        while not self.stop_event.is_set():
+            getattr(self, self.random.choices(self.actions, self.weights)[0])()
+            if self.think_time:
+                self.stop_event.wait(self.random.uniform(0.5, 1.5) * self.think_time)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate dashboard-like load against a running server and find its saturation point. "
+        "Start the server with SUBTASK_GENERATOR=fake so the LLM is not called."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api', help='API base URL')
+        parser.add_argument(
+            '--stages', default='10,25,50,100,200',
+            help='Comma separated concurrent user counts, run in order'
+        )
+        parser.add_argument('--stage-duration', type=float, default=60, help='Seconds per stage')
+        parser.add_argument('--ramp-up', type=float, default=10, help='Seconds to start the new users of a stage')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between actions (s)')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Action weights, e.g. "list=40,create=15"')
+        parser.add_argument('--interval', type=float, default=5, help='Reporting interval (s)')
+        parser.add_argument(
+            '--saturation-gain', type=float, default=0.1,
+            help='Stage is saturated when throughput grows less than this vs the previous stage'
+        )
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+        parser.add_argument('--no-seed', action='store_true', help='Do not create the loadtest_* users')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write timeline and stage results as JSON to this path')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        try:
+            stages = [int(n) for n in options['stages'].split(',')]
+        except ValueError:
+            raise CommandError("--stages must be a comma separated list of integers")
+        if stages != sorted(stages) or stages[0] < 1:
+            raise CommandError("--stages must be positive and increasing")
+
+        emails = [f'loadtest_{i}@example.com' for i in range(stages[-1])]
+        if not options['no_seed']:
+            User.objects.bulk_create(
+                [User(username=f'loadtest_{i}', email=email) for i, email in enumerate(emails)],
+                ignore_conflicts=True
+            )
+
+        recorder = Recorder()
+        stop_event = threading.Event()
+        users = []
+        timeline = []
+        results = []
+        start = time.monotonic()
+
+        self.stdout.write(f"{'t (s)':>7} {'users':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        try:
+            for target in stages:
+                stage_start = time.monotonic()
+                measured_from = stage_start + options['ramp_up']
+                stage_end = stage_start + options['stage_duration']
+                new_users = target - len(users)
+                spawned = 0
+                stage_samples = []
+                next_report = stage_start + options['interval']
+
+                while time.monotonic() < stage_end:
+                    now = time.monotonic()
+                    while spawned < new_users and now >= stage_start + options['ramp_up'] * spawned / new_users:
+                        vu = VirtualUser(
+                            options['url'], emails[len(users)], mix, options['think_time'],
+                            recorder, stop_event, options['seed'] + len(users)
+                        )
+                        vu.start()
+                        users.append(vu)
+                        spawned += 1
+                    if now >= next_report:
+                        samples = recorder.drain()
+                        stage_samples.extend(samples)
+                        point = summarize(samples, options['interval'])
+                        point.update(t=round(now - start, 1), users=len(users))
+                        timeline.append(point)
+                        self.stdout.write(
+                            f"{point['t']:>7} {point['users']:>6} {point['throughput_rps']:>8} {point['p50_ms']:>9} "
+                            f"{point['p95_ms']:>9} {point['p99_ms']:>9} {point['error_rate']:>7.1%}"
+                        )
+                        next_report += options['interval']
+                    time.sleep(0.05)
+
+                stage_samples.extend(recorder.drain())
+                steady = [s for s in stage_samples if s['at'] >= measured_from]
+                stage = summarize(steady, max(stage_end - measured_from, 0.001))
+                stage['users'] = target
+                results.append(stage)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"Stage {target} users: {stage['throughput_rps']} rps, p95 {stage['p95_ms']} ms, "
+                    f"errors {stage['error_rate']:.1%}"
+                ))
+        finally:
+            stop_event.set()
+
+        saturation = self.find_saturation(results, options['saturation_gain'], options['max_error_rate'])
+        if saturation:
+            self.stdout.write(self.style.WARNING(
+                f"Saturation at ~{saturation['users']} concurrent users ({saturation['throughput_rps']} rps)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("No saturation detected; try higher --stages"))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'url': options['url'], 'mix': mix, 'think_time': options['think_time'],
+                    'stages': results, 'timeline': timeline, 'saturation': saturation,
+                }, f, indent=2)
+            self.stdout.write(f"Results saved to {options['output']}")
+
+    def find_saturation(self, stages, min_gain, max_error_rate):
+        """Last stage before throughput stops scaling or errors appear"""
+        for previous, current in zip(stages, stages[1:]):
+            if current['error_rate'] > max_error_rate:
+                return previous
+            if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+                return previous
+        if stages and stages[0]['error_rate'] > max_error_rate:
+            return stages[0]
+        return None
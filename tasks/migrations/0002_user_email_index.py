@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index auth_user.email, used by the email-only login"""
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX IF EXISTS auth_user_email_idx;',
+        ),
+    ]
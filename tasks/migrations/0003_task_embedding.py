@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 11:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_user_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskEmbedding',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='tasks.task')),
+                ('vector', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'task_embeddings',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSubtaskGeneration',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pending_generation', serialize=False, to='tasks.task')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'subtask_generation_queue',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -25,10 +25,15 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listado por usuario (task_list)
+            models.Index(fields=['user', '-created_at']),
+            # Candidatas a archivar (archive_tasks)
+            models.Index(fields=['status', 'updated_at']),
+        ]
         # indexes = [
         #     models.Index(fields=['user', 'status']),
         #     models.Index(fields=['user', 'category']),
-        #     models.Index(fields=['user', '-created_at']),
         # ]
         db_table = 'tasks'
 
@@ -50,4 +55,72 @@ class SubTasks(models.Model):
         db_table = 'subtasks'
 
     def __str__(self):
-        return f"{self.title} - {'Completed' if self.is_completed else 'Pending'}"
\ No newline at end of file
+        return f"{self.title} - {'Completed' if self.is_completed else 'Pending'}"
+
+
+class TaskEmbedding(models.Model):
+    """
+    Hashed TF embedding of a task (title + description) for the subtask similarity cache
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    vector = models.BinaryField()
+
+    class Meta:
+        db_table = 'task_embeddings'
+
+
+class PendingSubtaskGeneration(models.Model):
+    """
+    Imported task whose AI subtask generation was deferred (see generate_subtasks command)
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name='pending_generation')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        db_table = 'subtask_generation_queue'
+
+
+class ArchivedTask(models.Model):
+    """
+    Completed task moved out of the hot tasks table (see archive_tasks command).
+    Keeps the original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=status, default='is_completed')
+    category = models.CharField(max_length=20, choices=category, default='work')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+        db_table = 'tasks_archive'
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+
+class ArchivedSubTask(models.Model):
+    """
+    Subtask of an ArchivedTask. Keeps the original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='subtasks')
+    title = models.CharField(max_length=255)
+    is_completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'subtasks_archive'
+
+    def __str__(self):
+        return f"{self.title} - {'Completed' if self.is_completed else 'Pending'}"
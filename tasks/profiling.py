@@ -0,0 +1,188 @@
+"""
+On-demand request profiling (opt-in, admins only).
+
+Enable with PROFILING_ENABLED=1. A staff user can then profile one request by
+adding ``?profile=<mode>`` or the ``X-Profile: <mode>`` header:
+
+- ``text``: cProfile report sorted by cumulative time (also ``1``)
+- ``pstats``: marshalled cProfile stats, loadable with ``pstats.Stats``
+- ``collapsed``: sampled stacks in flamegraph.pl / speedscope collapsed format
+
+If PROFILING_DIR is set the profile is written there and the normal response
+is returned with an ``X-Profile-File`` header.
+
+PROFILING_SAMPLE_INTERVAL > 0 also starts a background sampler that records the
+stacks of every in-flight request at that interval; the aggregate is served by
+``GET /api/profiling/stacks/``.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+
+
+MODES = {'1': 'text', 'text': 'text', 'pstats': 'pstats', 'collapsed': 'collapsed'}
+
+# Intervalo de muestreo para el perfil de una sola peticion
+REQUEST_SAMPLE_INTERVAL = 0.001
+
+
+def collapse_frame(frame):
+    """Render a frame and its callers as 'outer;...;inner'"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Samples the Python stacks of a set of threads into collapsed-stack counts"""
+
+    def __init__(self, interval, thread_ids):
+        super().__init__(daemon=True, name='stack-sampler')
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id in list(self.thread_ids):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self.counts[collapse_frame(frame)] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        with self.lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self.counts.most_common()) + '\n'
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+
+# cProfile usa sys.monitoring (3.12+): un segundo Profile().enable() en otro hilo falla
+cprofile_lock = threading.Lock()
+
+# Muestreador global (modo background); None si esta desactivado
+background_sampler = None
+active_threads = set()
+
+
+def sampled(chunks):
+    """Keep the thread that iterates a streamed body in active_threads while it runs"""
+    thread_id = threading.get_ident()
+    active_threads.add(thread_id)
+    try:
+        yield from chunks
+    finally:
+        active_threads.discard(thread_id)
+
+
+class ProfilingMiddleware:
+    """Profile single requests on demand and feed the background sampler"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.output_dir = getattr(settings, 'PROFILING_DIR', '')
+
+        global background_sampler
+        interval = getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0)
+        if interval and background_sampler is None:
+            background_sampler = StackSampler(interval, active_threads)
+            background_sampler.start()
+
+    def __call__(self, request):
+        mode = MODES.get(request.GET.get('profile') or request.headers.get('X-Profile', ''))
+        user = getattr(request, 'user', None)
+        if mode and user is not None and user.is_staff:
+            return self.profile(request, mode)
+
+        if background_sampler is None:
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        active_threads.add(thread_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            active_threads.discard(thread_id)
+        if response.streaming:
+            # task_list/task_export serializan mientras se envía el cuerpo, fuera de get_response
+            response.streaming_content = sampled(response.streaming_content)
+        return response
+
+    def get_response_consumed(self, request):
+        """get_response, reading streamed bodies so their generators run while profiling"""
+        response = self.get_response(request)
+        if response.streaming:
+            # task_list serializa al iterar; se reconstruye el cuerpo para PROFILING_DIR
+            response.streaming_content = [b''.join(response.streaming_content)]
+        return response
+
+    def profile(self, request, mode):
+        if mode == 'collapsed':
+            sampler = StackSampler(REQUEST_SAMPLE_INTERVAL, {threading.get_ident()})
+            sampler.start()
+            try:
+                response = self.get_response_consumed(request)
+            finally:
+                sampler.stop()
+            content, content_type, extension = sampler.collapsed().encode('utf-8'), 'text/plain', 'collapsed'
+        else:
+            # Desde Python 3.12 solo puede haber un cProfile activo por proceso
+            if not cprofile_lock.acquire(blocking=False):
+                return JsonResponse(
+                    {"error": "Ya hay otra petición perfilándose con cProfile; reintenta o usa profile=collapsed"},
+                    status=409
+                )
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = self.get_response_consumed(request)
+                finally:
+                    profiler.disable()
+            finally:
+                cprofile_lock.release()
+            if mode == 'pstats':
+                stats = pstats.Stats(profiler)
+                content, content_type, extension = marshal.dumps(stats.stats), 'application/octet-stream', 'prof'
+            else:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(50)
+                content, content_type, extension = out.getvalue().encode('utf-8'), 'text/plain', 'txt'
+
+        if self.output_dir:
+            slug = request.path.strip('/').replace('/', '_') or 'root'
+            path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}.{extension}")
+            with open(path, 'wb') as f:
+                f.write(content)
+            response['X-Profile-File'] = path
+            return response
+
+        profile_response = HttpResponse(content, content_type=content_type)
+        profile_response['X-Profiled-Status'] = str(response.status_code)
+        if mode == 'pstats':
+            profile_response['Content-Disposition'] = 'attachment; filename="request.prof"'
+        return profile_response
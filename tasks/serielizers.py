@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Task, SubTasks
+from .models import Task, SubTasks, ArchivedTask, ArchivedSubTask
+from .auth import get_user_profile
 from django.contrib.auth.models import User
 
 
@@ -74,6 +75,18 @@ class SubTaskUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
+class SubTaskBulkUpdateSerializer(serializers.Serializer):
+    """Serializer para cada operación de la actualización masiva de subtareas"""
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=255, required=False)
+    is_completed = serializers.BooleanField(required=False)
+    
+    def validate_title(self, value):
+        if len(value.strip()) < 3:
+            raise serializers.ValidationError("El título debe tener al menos 3 caracteres")
+        return value
+
+
 class SubTaskListSerializer(serializers.ModelSerializer):
     """Serializer simplificado para listar subtareas dentro de Task"""
     class Meta:
@@ -87,7 +100,7 @@ class SubTaskListSerializer(serializers.ModelSerializer):
 class TaskSerializer(serializers.ModelSerializer):
     """Serializer completo para listar/obtener tareas con subtareas"""
     subtasks = SubTaskListSerializer(many=True, read_only=True)
-    user_info = UserSerializer(source='user', read_only=True)
+    user_info = serializers.SerializerMethodField()
     subtasks_count = serializers.SerializerMethodField()
     completed_subtasks_count = serializers.SerializerMethodField()
     
@@ -100,11 +113,16 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def get_user_info(self, obj):
+        # Perfil cacheado (mismos campos que UserSerializer) en vez de una query por tarea
+        return get_user_profile(obj.user_id)
+    
     def get_subtasks_count(self, obj):
         return obj.subtasks.count()
     
     def get_completed_subtasks_count(self, obj):
-        return obj.subtasks.filter(is_completed=True).count()
+        # Recorre subtasks.all() para aprovechar prefetch_related en el listado
+        return sum(1 for subtask in obj.subtasks.all() if subtask.is_completed)
 
 
 class TaskListSerializer(serializers.ModelSerializer):
@@ -173,7 +191,7 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
 class TaskDetailSerializer(serializers.ModelSerializer):
     """Serializer detallado para obtener una tarea específica"""
     subtasks = SubTaskSerializer(many=True, read_only=True)
-    user_info = UserSerializer(source='user', read_only=True)
+    user_info = serializers.SerializerMethodField()
     
     class Meta:
         model = Task
@@ -182,8 +200,83 @@ class TaskDetailSerializer(serializers.ModelSerializer):
             'status', 'category', 'created_at', 'updated_at', 'subtasks'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+    
+    def get_user_info(self, obj):
+        return get_user_profile(obj.user_id)
+
+
+class ArchivedSubTaskSerializer(serializers.ModelSerializer):
+    """Serializer para subtareas archivadas dentro de ArchivedTask"""
+    class Meta:
+        model = ArchivedSubTask
+        fields = ['id', 'title', 'is_completed', 'created_at']
 
 
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    """Serializer de tareas archivadas, con la misma forma que TaskSerializer"""
+    subtasks = ArchivedSubTaskSerializer(many=True, read_only=True)
+    user_info = serializers.SerializerMethodField()
+    subtasks_count = serializers.SerializerMethodField()
+    completed_subtasks_count = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ArchivedTask
+        fields = [
+            'id', 'user', 'user_info', 'title', 'description',
+            'status', 'category', 'created_at', 'updated_at', 'archived_at',
+            'subtasks', 'subtasks_count', 'completed_subtasks_count'
+        ]
+        read_only_fields = fields
+    
+    def get_user_info(self, obj):
+        return get_user_profile(obj.user_id)
+    
+    def get_subtasks_count(self, obj):
+        return obj.subtasks.count()
+    
+    def get_completed_subtasks_count(self, obj):
+        return sum(1 for subtask in obj.subtasks.all() if subtask.is_completed)
+
+
+# ==================== NDJSON IMPORT/EXPORT SERIALIZERS ====================
+
+class TaskExportSerializer(serializers.ModelSerializer):
+    """Serializer para exportar tareas (una línea NDJSON por tarea)"""
+    subtasks = SubTaskListSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'user', 'title', 'description', 'status', 'category',
+            'created_at', 'updated_at', 'subtasks'
+        ]
+
+
+class SubTaskImportSerializer(serializers.Serializer):
+    """Serializer para las subtareas de una línea importada"""
+    title = serializers.CharField(max_length=255)
+    is_completed = serializers.BooleanField(default=False)
+
+
+class TaskImportSerializer(serializers.Serializer):
+    """Serializer para cada línea de la importación NDJSON"""
+    user = serializers.IntegerField()
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    status = serializers.ChoiceField(choices=['pending', 'is_completed'], default='pending')
+    category = serializers.ChoiceField(choices=['work', 'personal', 'urgent'], default='work')
+    subtasks = SubTaskImportSerializer(many=True, required=False)
+    
+    def validate_title(self, value):
+        if len(value.strip()) < 3:
+            raise serializers.ValidationError("El título debe tener al menos 3 caracteres")
+        return value
+    
+    def validate_description(self, value):
+        if len(value.strip()) < 10:
+            raise serializers.ValidationError("La descripción debe tener al menos 10 caracteres")
+        return value
+
 
 class BulkDeleteSerializer(serializers.Serializer):
     """Serializer para eliminación múltiple"""
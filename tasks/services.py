@@ -1,16 +1,21 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from django.conf import settings
+import hashlib
 import logging
 import json
 import os
 
 logger = logging.getLogger(__name__)
 
+# El stack de LangChain/Gemini se importa en el primer uso, no al cargar el modulo:
+# migrate, shell y los workers web no deben pagar su coste de arranque.
+LLM_MODULES = ('langchain_google_genai', 'langchain_core', 'grpc', 'google.protobuf')
+
+
 class SubtaskGenerator:
     def __init__(self):
         """Initialize the Gemini LLM for subtask generation"""
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         api_key = getattr(settings, 'GEMINI_API_KEY', os.environ.get('GEMINI_API_KEY'))
         model_name = getattr(settings, 'GEMINI_MODEL', 'gemini-2.5-flash')
         self.llm = ChatGoogleGenerativeAI(
@@ -19,17 +24,21 @@ class SubtaskGenerator:
             temperature=0.7
         )
 
-    def generate(self, task_title: str, task_description: str, max_subtasks: int = 5):
+    def generate(self, task_title: str, task_description: str, max_subtasks: int = 5, raise_on_error: bool = False):
         """Generate subtasks using LangChain and Gemini
 
         Args:
             task_title: The title of the main task
             task_description: The description of the main task
             max_subtasks: Maximum number of subtasks to generate (default: 5)
+            raise_on_error: Re-raise LLM/parse errors instead of returning the
+                default subtasks (deferred generation retries them later)
 
         Returns:
             List of dictionaries with subtask data
         """
+        from langchain_core.prompts import ChatPromptTemplate
+
         try:
             prompt = ChatPromptTemplate.from_messages([
                 ("system", """You are an expert assistant that breaks down tasks into manageable subtasks.
@@ -95,9 +104,43 @@ Generate the necessary subtasks to complete this task. Remember to return ONLY a
 
         except Exception as e:
             logger.error(f"Error generating subtasks: {str(e)}")
+            if raise_on_error:
+                raise
             # Return default subtask if generation fails
             return [
                 {'title': 'Review and plan the task'},
                 {'title': 'Break down into smaller steps'},
                 {'title': 'Execute and complete the task'}
             ]
+
+
+class FakeSubtaskGenerator:
+    """Deterministic stand-in for SubtaskGenerator (benchmarks, load tests, offline dev).
+
+    Returns the same subtasks for the same title/description without calling the LLM.
+    """
+
+    STEPS = [
+        'Review requirements for',
+        'Plan the work for',
+        'Prepare resources for',
+        'Execute',
+        'Verify and close',
+    ]
+
+    def generate(self, task_title: str, task_description: str, max_subtasks: int = 5, raise_on_error: bool = False):
+        digest = hashlib.sha1(f"{task_title}\n{task_description}".encode('utf-8')).digest()
+        count = min(max_subtasks, 3 + digest[0] % 3)
+        return [{'title': f"{step} {task_title}"[:255]} for step in self.STEPS[:count]]
+
+
+GENERATORS = {
+    'gemini': SubtaskGenerator,
+    'fake': FakeSubtaskGenerator,
+}
+
+
+def get_subtask_generator():
+    """Return the generator configured in settings.SUBTASK_GENERATOR ('gemini' by default)"""
+    backend = getattr(settings, 'SUBTASK_GENERATOR', 'gemini')
+    return GENERATORS[backend]()
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.contrib.auth.models import User
 from .models import Task, SubTasks
-from .services import SubtaskGenerator
+from .auth import invalidate_user_profile
+from .services import get_subtask_generator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,20 +14,68 @@ logger = logging.getLogger(__name__)
 def create_subtasks(sender, instance, created, **kwargs):
     """Generate subtasks automatically when a task is created"""
     if not created:
+        update_fields = kwargs.get('update_fields')
+        text_changed = update_fields is None or {'title', 'description'} & set(update_fields)
+        if text_changed and getattr(settings, 'SUBTASK_SIMILARITY_ENABLED', False):
+            from . import similarity
+            similarity.refresh(instance)
         return
+    populate_subtasks(instance)
 
+
+@receiver(post_delete, sender=Task)
+def forget_task_embedding(sender, instance, **kwargs):
+    """Deleted and archived tasks stop being similarity candidates"""
+    if getattr(settings, 'SUBTASK_SIMILARITY_ENABLED', False):
+        from . import similarity
+        similarity.forget(instance)
+
+
+def populate_subtasks(instance, raise_on_error=False):
+    """Create the subtasks of a task (similarity cache or LLM). Also used for deferred generation.
+
+    Returns True if the subtasks were created; on failure nothing is saved and it returns False.
+    With raise_on_error an LLM failure counts as a failure instead of saving the
+    generator's default subtasks.
+    """
     try:
-        generator = SubtaskGenerator()
-        subtasks_data = generator.generate(
-            task_title=instance.title,
-            task_description=instance.description,
-            max_subtasks=5
-        )
+        subtasks_data = None
+        similarity_enabled = getattr(settings, 'SUBTASK_SIMILARITY_ENABLED', False)
+        if similarity_enabled:
+            # Si el cache de similitud falla se genera con el LLM igualmente
+            try:
+                from . import similarity
+                subtasks_data, vector = similarity.lookup(instance)
+            except Exception as e:
+                logger.warning(f"Similarity lookup failed for task {instance.id}: {str(e)}")
+                similarity_enabled = False
 
-        # Create subtasks
-        for subtask_data in subtasks_data:
-            SubTasks.objects.create(task=instance, **subtask_data)
+        if subtasks_data is None:
+            generator = get_subtask_generator()
+            subtasks_data = generator.generate(
+                task_title=instance.title,
+                task_description=instance.description,
+                max_subtasks=5,
+                raise_on_error=raise_on_error
+            )
+
+        # Create subtasks (todas o ninguna, para poder reintentar)
+        with transaction.atomic():
+            for subtask_data in subtasks_data:
+                SubTasks.objects.create(task=instance, **subtask_data)
+
+            if similarity_enabled:
+                similarity.remember(instance, vector)
 
         logger.info(f"Created {len(subtasks_data)} subtasks for task {instance.id}")
+        return True
     except Exception as e:
-        logger.error(f"Failed to create subtasks for task {instance.id}: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to create subtasks for task {instance.id}: {str(e)}")
+        return False
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Drop the cached profile so user_info and login see the update"""
+    invalidate_user_profile(instance.id)
@@ -0,0 +1,314 @@
+"""
+Semantic similarity cache for AI-generated subtasks.
+
+Each task gets a hashed TF embedding of its title and description (word
+unigrams plus character trigrams hashed into DIM buckets), stored in
+TaskEmbedding. An in-process NumPy index finds the most similar earlier task
+(one index per user with SCOPE 'user', capped at SUBTASK_SIMILARITY_MAX_INDEXED
+embeddings in total).
+Candidates come from random-hyperplane LSH once the index is large, and they
+are re-ranked by (sqrt) IDF-weighted cosine similarity. Above the threshold, that
+task's subtasks are reused and adapted to the new title, and no LLM call is
+made. Everything runs offline.
+
+Enable with SUBTASK_SIMILARITY_ENABLED=1 (requires numpy).
+"""
+import functools
+import logging
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .models import SubTasks, TaskEmbedding
+
+logger = logging.getLogger(__name__)
+
+DIM = 1024
+TITLE_WEIGHT = 2.0
+TOKEN_RE = re.compile(r'\w+')
+
+# Por debajo de este tamaño se compara contra todo el indice (exacto)
+BRUTE_FORCE_LIMIT = 4096
+# Filas por bloque al calcular normas con IDF (evita una copia al cuadrado de la matriz)
+NORM_CHUNK = 128
+LSH_TABLES = 10
+LSH_BITS = 6
+
+
+def features(text):
+    """Lowercased words plus their character trigrams"""
+    words = TOKEN_RE.findall(text.lower())
+    grams = []
+    for word in words:
+        padded = f'#{word}#'
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return words + grams
+
+
+def embed(title, description):
+    """Sublinear hashed term-frequency vector, L2-normalised (float32)"""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for text, weight in ((title, TITLE_WEIGHT), (description, 1.0)):
+        for feature in features(text):
+            vector[zlib.crc32(feature.encode('utf-8')) % DIM] += weight
+    np.log1p(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def adapt_subtasks(old_title, new_title, titles):
+    """Rewrite subtask titles for the new task by swapping the words that changed.
+
+    'Prepare Q3 report' -> 'Prepare Q4 report' turns 'Collect Q3 figures' into
+    'Collect Q4 figures'. Titles are reused unchanged if the word counts differ.
+    """
+    old_words, new_words = old_title.split(), new_title.split()
+    replacements = {}
+    if len(old_words) == len(new_words):
+        replacements = {o: n for o, n in zip(old_words, new_words) if o != n}
+    adapted = []
+    for title in titles:
+        for old, new in replacements.items():
+            title = re.sub(rf'(?<!\w){re.escape(old)}(?!\w)', new, title)
+        adapted.append(title[:255])
+    return adapted
+
+
+class SimilarityIndex:
+    """Growable in-memory matrix of embeddings with an LSH candidate filter.
+
+    Keys are kept in insertion order; with max_size the oldest ones are evicted.
+    """
+
+    def __init__(self, seed=0, capacity=64, max_size=None):
+        # np.empty: las filas sin usar no llegan a ocupar memoria residente
+        self.vectors = np.empty((capacity, DIM), dtype=np.float32)
+        self.keys = []
+        self.titles = []
+        # key -> fila, en orden de insercion (el primero es el mas antiguo)
+        self.rows = {}
+        self.max_size = max_size
+        self.doc_freq = np.zeros(DIM, dtype=np.float32)
+        self.planes = lsh_planes(seed)
+        self.powers = 1 << np.arange(LSH_BITS)
+        self.buckets = [{} for _ in range(LSH_TABLES)]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def signatures(self, vector):
+        bits = (self.planes @ vector) > 0
+        return (bits * self.powers).sum(axis=1)
+
+    def add(self, key, title, vector):
+        with self.lock:
+            if key in self.rows:
+                self._remove(key)
+            if self.max_size and len(self.keys) >= self.max_size:
+                self._remove(next(iter(self.rows)))
+            row = len(self.keys)
+            if row == len(self.vectors):
+                self.grow()
+            self.vectors[row] = vector
+            self.keys.append(key)
+            self.titles.append(title)
+            self.rows[key] = row
+            self.doc_freq += vector > 0
+            for table, signature in zip(self.buckets, self.signatures(self.vectors[row])):
+                table.setdefault(int(signature), []).append(row)
+
+    def grow(self):
+        """Grow capacity by half (never beyond max_size)"""
+        count = len(self.keys)
+        capacity = max(8, count + count // 2)
+        if self.max_size:
+            capacity = min(capacity, self.max_size)
+        grown = np.empty((capacity, DIM), dtype=np.float32)
+        grown[:count] = self.vectors[:count]
+        self.vectors = grown
+
+    def remove(self, key):
+        with self.lock:
+            if key in self.rows:
+                self._remove(key)
+
+    def _remove(self, key):
+        """Drop key, moving the last row into its place"""
+        row = self.rows.pop(key)
+        last = len(self.keys) - 1
+        self.doc_freq -= self.vectors[row] > 0
+        for table, signature in zip(self.buckets, self.signatures(self.vectors[row])):
+            table[int(signature)].remove(row)
+        if row != last:
+            for table, signature in zip(self.buckets, self.signatures(self.vectors[last])):
+                bucket = table[int(signature)]
+                bucket[bucket.index(last)] = row
+            self.vectors[row] = self.vectors[last]
+            self.keys[row] = self.keys[last]
+            self.titles[row] = self.titles[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.titles.pop()
+
+    def search(self, vector):
+        """Best (key, title, score) for vector"""
+        with self.lock:
+            count = len(self.keys)
+            if not count:
+                return None
+            if count <= BRUTE_FORCE_LIMIT:
+                rows = slice(0, count)
+                row_ids = np.arange(count)
+            else:
+                candidates = set()
+                for table, signature in zip(self.buckets, self.signatures(vector)):
+                    candidates.update(table.get(int(signature), ()))
+                row_ids = rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            if not len(row_ids):
+                return None
+
+            # Coseno con cada lado ponderado por sqrt(idf): (v*w)·(q*w) = v·(q*idf), |v*w| = sqrt(v^2·idf).
+            # La raiz suaviza el IDF, que con pocos usuarios/tareas casi iguales castiga de mas lo comun.
+            idf = np.log((1 + count) / (1 + self.doc_freq)) + 1
+            matrix = self.vectors[rows]
+            norms = np.sqrt(weighted_square_norms(matrix, idf)) * np.sqrt((vector * vector) @ idf)
+            scores = (matrix @ (vector * idf)) / np.where(norms > 0, norms, 1.0)
+            best = int(np.argmax(scores))
+            row = int(row_ids[best])
+            return self.keys[row], self.titles[row], float(scores[best])
+
+
+def weighted_square_norms(matrix, idf):
+    """(row * row) @ idf for every row, in blocks of NORM_CHUNK rows"""
+    norms = np.empty(len(matrix), dtype=np.float32)
+    scratch = np.empty((min(NORM_CHUNK, len(matrix)), DIM), dtype=np.float32)
+    for start in range(0, len(matrix), NORM_CHUNK):
+        chunk = matrix[start:start + NORM_CHUNK]
+        squared = scratch[:len(chunk)]
+        np.multiply(chunk, chunk, out=squared)
+        np.matmul(squared, idf, out=norms[start:start + len(chunk)])
+    return norms
+
+
+@functools.lru_cache(maxsize=None)
+def lsh_planes(seed):
+    """Random hyperplanes, shared by every index built with the same seed"""
+    planes = np.random.default_rng(seed).standard_normal((LSH_TABLES, LSH_BITS, DIM)).astype(np.float32)
+    planes.flags.writeable = False
+    return planes
+
+
+# SCOPE 'global': un solo indice. SCOPE 'user': un indice por usuario, cargado al
+# primer uso y descartado (LRU) cuando el total supera SUBTASK_SIMILARITY_MAX_INDEXED.
+index = None
+user_indexes = OrderedDict()
+index_lock = threading.Lock()
+stats = {'hits': 0, 'misses': 0}
+
+
+def per_user():
+    return getattr(settings, 'SUBTASK_SIMILARITY_SCOPE', 'user') == 'user'
+
+
+def max_indexed():
+    return getattr(settings, 'SUBTASK_SIMILARITY_MAX_INDEXED', 20000)
+
+
+def load_index(embeddings):
+    """Index of the most recent embeddings in the queryset (at most max_indexed())"""
+    limit = max_indexed()
+    loaded = SimilarityIndex(capacity=8, max_size=limit)
+    rows = embeddings.order_by('-task_id').values_list('task_id', 'task__title', 'vector')[:limit]
+    for task_id, title, vector in reversed(list(rows)):
+        loaded.add(task_id, title, np.frombuffer(vector, dtype=np.float32))
+    return loaded
+
+
+def get_index(user_id):
+    """Index to search for a task of user_id, loaded from TaskEmbedding on first use"""
+    global index
+    with index_lock:
+        if not per_user():
+            if index is None:
+                index = load_index(TaskEmbedding.objects.all())
+            return index
+
+        loaded = user_indexes.get(user_id)
+        if loaded is not None:
+            user_indexes.move_to_end(user_id)
+            return loaded
+        loaded = user_indexes[user_id] = load_index(TaskEmbedding.objects.filter(task__user_id=user_id))
+        evict_users(keep=user_id)
+        return loaded
+
+
+def evict_users(keep):
+    """Drop least recently used user indexes (not keep's) while over max_indexed(). Call with index_lock held."""
+    # Un indice vacio cuenta como 1 para que no se acumulen sin limite
+    total = sum(max(len(i), 1) for i in user_indexes.values())
+    for user_id in list(user_indexes):
+        if total <= max_indexed():
+            break
+        if user_id != keep:
+            total -= max(len(user_indexes.pop(user_id)), 1)
+
+
+def loaded_index(user_id):
+    """Index holding user_id's tasks if it is already in memory, without loading it"""
+    with index_lock:
+        return user_indexes.get(user_id) if per_user() else index
+
+
+def lookup(task):
+    """Adapted subtasks of the most similar earlier task, or None.
+
+    Returns (subtasks_data or None, embedding) so the caller can remember() the task.
+    """
+    vector = embed(task.title, task.description)
+    threshold = getattr(settings, 'SUBTASK_SIMILARITY_THRESHOLD', 0.8)
+
+    match = get_index(task.user_id).search(vector)
+    if match is not None and match[2] >= threshold:
+        neighbour_id, neighbour_title, score = match
+        titles = list(SubTasks.objects.filter(task_id=neighbour_id).order_by('id').values_list('title', flat=True))
+        if titles:
+            stats['hits'] += 1
+            logger.info(f"Reusing subtasks of task {neighbour_id} for {task.title!r} (similarity {score:.2f})")
+            return [{'title': t} for t in adapt_subtasks(neighbour_title, task.title, titles)], vector
+
+    stats['misses'] += 1
+    return None, vector
+
+
+def remember(task, vector):
+    """Store the task embedding and add it to the in-process index"""
+    loaded = get_index(task.user_id)
+    TaskEmbedding.objects.create(task=task, vector=vector.astype(np.float32).tobytes())
+    loaded.add(task.id, task.title, vector)
+    if per_user():
+        with index_lock:
+            evict_users(keep=task.user_id)
+
+
+def forget(task):
+    """Drop a deleted or archived task from the in-process index"""
+    loaded = loaded_index(task.user_id)
+    if loaded is not None:
+        loaded.remove(task.id)
+
+
+def refresh(task):
+    """Forget a task whose title or description changed: its subtasks no longer match the text"""
+    stored = TaskEmbedding.objects.filter(task_id=task.id).values_list('vector', flat=True).first()
+    if stored is None or np.array_equal(np.frombuffer(stored, dtype=np.float32), embed(task.title, task.description)):
+        return
+    TaskEmbedding.objects.filter(task_id=task.id).delete()
+    forget(task)
@@ -0,0 +1,53 @@
+"""
+Incremental JSON / NDJSON encoding for large responses.
+
+Items are serialized in chunks so the full payload is never held in memory;
+output is buffered up to BUFFER_SIZE bytes per yielded chunk.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+
+
+BUFFER_SIZE = 64 * 1024
+QUERY_CHUNK_SIZE = 500
+
+encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_serialized(queryset, serializer_class, chunk_size=QUERY_CHUNK_SIZE):
+    """Serialize a queryset object by object, fetching chunk_size rows at a time"""
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield serializer_class(obj).data
+
+
+def iter_json_array(items):
+    """Yield a JSON array of the given dicts as bytes chunks"""
+    buffer = [b'[']
+    size = 1
+    first = True
+    for data in items:
+        item = encoder.encode(data).encode('utf-8')
+        if not first:
+            buffer.append(b',')
+        buffer.append(item)
+        size += len(item) + 1
+        first = False
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(b']')
+    yield b''.join(buffer)
+
+
+def iter_ndjson(items):
+    """Yield one JSON document per line (NDJSON) as bytes chunks"""
+    buffer = []
+    size = 0
+    for data in items:
+        line = encoder.encode(data).encode('utf-8') + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
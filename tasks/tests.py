@@ -1,3 +1,672 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import threading
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import compression, profiling, similarity
+from .archiving import archive_batch
+from .bulk import MAX_BATCH_SIZE, MAX_LINE_BYTES
+from .auth import issue_token, local_profiles
+from .models import ArchivedSubTask, PendingSubtaskGeneration, SubTasks, Task, TaskEmbedding
+from .services import LLM_MODULES, SubtaskGenerator
+from .streaming import BUFFER_SIZE
+
+
+class StartupImportTests(SimpleTestCase):
+    """El stack de IA no debe cargarse al arrancar Django"""
+
+    # Segundos permitidos para django.setup() en un proceso nuevo
+    IMPORT_TIME_BUDGET = 3.0
+
+    def test_setup_does_not_import_ai_stack_and_fits_budget(self):
+        script = (
+            "import sys, time\n"
+            "started = time.perf_counter()\n"
+            "import django\n"
+            "django.setup()\n"
+            "print(time.perf_counter() - started)\n"
+            f"print(','.join(m for m in {LLM_MODULES!r} if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=dict(os.environ),
+            capture_output=True, text=True, check=True
+        )
+        elapsed, loaded = result.stdout.splitlines()[-2:]
+
+        self.assertEqual(loaded, '', f"AI modules imported at startup: {loaded}")
+        self.assertLess(float(elapsed), self.IMPORT_TIME_BUDGET)
+
+
+class AuthTokenTests(TestCase):
+    """Token firmado del login frente al user_id del query string"""
+
+    def setUp(self):
+        cache.clear()
+        local_profiles.clear()
+        self.owner = User.objects.create(username='owner', email='owner@example.com')
+        self.other = User.objects.create(username='other', email='other@example.com')
+        self.own_task, self.other_task = Task.objects.bulk_create([
+            Task(user=self.owner, title='Tarea propia', description='Descripción propia'),
+            Task(user=self.other, title='Tarea ajena', description='Descripción ajena'),
+        ])
+
+    def auth(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def list_ids(self, response):
+        return [task['id'] for task in json.loads(b''.join(response.streaming_content))]
+
+    def test_login_returns_token_for_user(self):
+        response = self.client.post('/api/login/', {'email': 'owner@example.com'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        listed = self.client.get('/api/tasks/', **self.auth(response.json()['token']))
+        self.assertEqual(self.list_ids(listed), [self.own_task.id])
+
+    def test_bad_token_returns_401(self):
+        token = issue_token(self.owner.id) + 'x'
+
+        self.assertEqual(self.client.get('/api/tasks/', **self.auth(token)).status_code, 401)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.own_task.id}/', **self.auth(token)).status_code, 401)
+
+    @override_settings(AUTH_TOKEN_MAX_AGE=60)
+    def test_expired_token_returns_401(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 3600):
+            token = issue_token(self.owner.id)
+
+        response = self.client.get('/api/tasks/', **self.auth(token))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"error": "Token inválido o expirado"})
+
+    def test_token_takes_precedence_over_user_id(self):
+        token = issue_token(self.owner.id)
+
+        listed = self.client.get(f'/api/tasks/?user_id={self.other.id}', **self.auth(token))
+        detail = self.client.get(f'/api/tasks/{self.other_task.id}/?user_id={self.other.id}', **self.auth(token))
+
+        self.assertEqual(self.list_ids(listed), [self.own_task.id])
+        self.assertEqual(detail.status_code, 403)
+
+    def test_token_user_must_own_created_task(self):
+        token = issue_token(self.owner.id)
+        data = {"title": "Tarea nueva", "description": "Descripción de la tarea nueva"}
+
+        with override_settings(SUBTASK_GENERATOR='fake'):
+            foreign = self.client.post('/api/tasks/', {**data, "user": self.other.id}, content_type='application/json', **self.auth(token))
+            own = self.client.post('/api/tasks/', {**data, "user": self.owner.id}, content_type='application/json', **self.auth(token))
+
+        self.assertEqual(foreign.status_code, 403)
+        self.assertEqual(own.status_code, 201)
+        self.assertFalse(Task.objects.filter(user=self.other, title='Tarea nueva').exists())
+
+    def test_token_user_must_own_edited_subtask(self):
+        token = issue_token(self.owner.id)
+        own, foreign = SubTasks.objects.bulk_create([
+            SubTasks(task=self.own_task, title='Propia'),
+            SubTasks(task=self.other_task, title='Ajena'),
+        ])
+
+        patched = self.client.patch(f'/api/subtasks/{foreign.id}/', {"is_completed": True}, content_type='application/json', **self.auth(token))
+        deleted = self.client.delete(f'/api/subtasks/{foreign.id}/', **self.auth(token))
+        allowed = self.client.patch(f'/api/subtasks/{own.id}/', {"is_completed": True}, content_type='application/json', **self.auth(token))
+
+        self.assertEqual((patched.status_code, deleted.status_code, allowed.status_code), (403, 403, 200))
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_completed)
+
+
+@override_settings(SUBTASK_GENERATOR='fake', SUBTASK_SIMILARITY_ENABLED=True, SUBTASK_SIMILARITY_SCOPE='user')
+class SimilarityIndexTests(TestCase):
+    """Indices por usuario y claves obsoletas del cache de similitud"""
+
+    def setUp(self):
+        similarity.index = None
+        similarity.user_indexes.clear()
+        self.ana = User.objects.create(username='ana', email='ana@example.com')
+        self.luis = User.objects.create(username='luis', email='luis@example.com')
+        self.report = Task.objects.create(
+            user=self.ana, title='Prepare Q3 report', description='Compile the Q3 financial report'
+        )
+        self.flights = Task.objects.create(
+            user=self.luis, title='Book flights to Lima', description='Find and book flights for the trip'
+        )
+        similarity.user_indexes.clear()
+
+    def test_user_scope_loads_only_that_users_embeddings(self):
+        self.assertEqual(similarity.get_index(self.ana.id).keys, [self.report.id])
+        self.assertEqual(similarity.get_index(self.luis.id).keys, [self.flights.id])
+
+    @override_settings(SUBTASK_SIMILARITY_MAX_INDEXED=1)
+    def test_least_recently_used_user_is_evicted(self):
+        similarity.get_index(self.ana.id)
+        similarity.get_index(self.luis.id)
+
+        self.assertEqual(list(similarity.user_indexes), [self.luis.id])
+
+    @override_settings(SUBTASK_SIMILARITY_MAX_INDEXED=2)
+    def test_remember_enforces_cap_across_users(self):
+        similarity.get_index(self.ana.id)
+        similarity.get_index(self.luis.id)
+
+        Task.objects.create(user=self.luis, title='Book flights to Paris', description='Find and book flights for Paris')
+
+        self.assertEqual(list(similarity.user_indexes), [self.luis.id])
+
+    def test_index_never_grows_past_max_size(self):
+        index = similarity.SimilarityIndex(capacity=2, max_size=5)
+        for key in range(20):
+            index.add(key, f'Task {key}', similarity.embed(f'Task {key}', 'Description'))
+
+        self.assertEqual(list(index.rows), [15, 16, 17, 18, 19])
+        self.assertLessEqual(len(index.vectors), 5)
+        self.assertEqual(index.search(similarity.embed('Task 17', 'Description'))[0], 17)
+
+    def test_failed_lookup_falls_back_to_generator(self):
+        with mock.patch('tasks.similarity.lookup', side_effect=RuntimeError('sin numpy')), \
+                self.assertLogs('tasks.signals', level='WARNING'):
+            task = Task.objects.create(user=self.ana, title='Prepare Q4 report', description='Compile the Q4 report')
+
+        self.assertTrue(task.subtasks.exists())
+        self.assertFalse(TaskEmbedding.objects.filter(task=task).exists())
+
+    def test_deleted_task_is_forgotten(self):
+        loaded = similarity.get_index(self.ana.id)
+
+        self.report.delete()
+
+        self.assertNotIn(self.report.id, loaded)
+
+    def test_retitled_task_is_forgotten(self):
+        loaded = similarity.get_index(self.ana.id)
+
+        self.report.title = 'Plan Q3 marketing campaign'
+        self.report.save()
+
+        self.assertNotIn(self.report.id, loaded)
+        self.assertFalse(TaskEmbedding.objects.filter(task=self.report).exists())
+
+    def test_status_change_keeps_embedding(self):
+        loaded = similarity.get_index(self.ana.id)
+
+        self.report.status = 'is_completed'
+        self.report.save()
+
+        self.assertIn(self.report.id, loaded)
+
+    def test_similar_task_reuses_subtasks_of_same_user_only(self):
+        hits = similarity.stats['hits']
+        Task.objects.create(user=self.luis, title='Prepare Q4 report', description='Compile the Q4 financial report')
+        self.assertEqual(similarity.stats['hits'], hits)
+
+        task = Task.objects.create(user=self.ana, title='Prepare Q4 report', description='Compile the Q4 financial report')
+
+        self.assertEqual(similarity.stats['hits'], hits + 1)
+        reused = [s.title for s in task.subtasks.order_by('id')]
+        expected = [s.title.replace('Q3', 'Q4') for s in self.report.subtasks.order_by('id')]
+        self.assertEqual(reused, expected)
+        self.assertEqual(similarity.get_index(self.ana.id).keys, [self.report.id, task.id])
+
+
+class SubtaskBulkUpdateTests(TestCase):
+    """PATCH /tasks/<id>/subtasks/: un solo UPDATE con CASE y progreso de la tarea"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='owner', email='owner@example.com')
+        self.task, self.other_task = Task.objects.bulk_create([
+            Task(user=self.user, title='Tarea', description='Descripción de la tarea'),
+            Task(user=self.user, title='Otra tarea', description='Descripción de otra tarea'),
+        ])
+        self.first, self.second, self.third, self.foreign = SubTasks.objects.bulk_create([
+            SubTasks(task=self.task, title='Primera'),
+            SubTasks(task=self.task, title='Segunda'),
+            SubTasks(task=self.task, title='Tercera', is_completed=True),
+            SubTasks(task=self.other_task, title='Ajena'),
+        ])
+        self.url = f'/api/tasks/{self.task.id}/subtasks/'
+
+    def patch(self, operations):
+        return self.client.patch(self.url, operations, content_type='application/json')
+
+    def test_updates_each_field_only_where_given_and_returns_progress(self):
+        response = self.patch([
+            {"id": self.first.id, "is_completed": True},
+            {"id": self.second.id, "title": "Segunda renombrada"},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "task": self.task.id, "updated": 2, "subtasks_count": 3, "completed_subtasks_count": 2
+        })
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.title, self.first.is_completed), ('Primera', True))
+        self.assertEqual((self.second.title, self.second.is_completed), ('Segunda renombrada', False))
+
+    def test_repeated_id_merges_operations(self):
+        response = self.patch([
+            {"id": self.first.id, "title": "Primera renombrada"},
+            {"id": self.first.id, "is_completed": True},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.title, self.first.is_completed), ('Primera renombrada', True))
+
+    def test_missing_or_foreign_subtask_returns_404_and_rolls_back(self):
+        for missing_id in (self.foreign.id, self.foreign.id + 100):
+            with self.subTest(missing_id=missing_id):
+                response = self.patch([
+                    {"id": self.first.id, "is_completed": True},
+                    {"id": missing_id, "is_completed": True},
+                ])
+
+                self.assertEqual(response.status_code, 404)
+                self.first.refresh_from_db()
+                self.foreign.refresh_from_db()
+                self.assertFalse(self.first.is_completed)
+                self.assertFalse(self.foreign.is_completed)
+
+    def test_create_subtask_does_not_refetch_task(self):
+        # SELECT de la tarea + INSERT; task_title sale de la tarea ya cargada
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {"title": "Nueva"}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['task_title'], 'Tarea')
+
+
+class ArchivedTaskTests(TestCase):
+    """Las tareas archivadas se listan y se leen, pero no se modifican"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='owner', email='owner@example.com')
+        self.done, self.active = Task.objects.bulk_create([
+            Task(user=self.user, title='Terminada', description='Tarea ya completada', status='is_completed'),
+            Task(user=self.user, title='Activa', description='Tarea todavía pendiente'),
+        ])
+        self.subtask = SubTasks.objects.create(task=self.done, title='Hecha', is_completed=True)
+        archive_batch(timezone.now(), batch_size=10)
+
+    def test_list_puts_archived_after_active(self):
+        response = self.client.get(f'/api/tasks/?user_id={self.user.id}&include_archived=true')
+
+        tasks = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([task['id'] for task in tasks], [self.active.id, self.done.id])
+        self.assertNotIn('archived_at', tasks[0])
+        self.assertIsNotNone(tasks[1]['archived_at'])
+
+    def test_detail_reads_archived_task(self):
+        response = self.client.get(f'/api/tasks/{self.done.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['subtasks'][0]['title'], 'Hecha')
+        self.assertIsNotNone(response.json()['archived_at'])
+
+    def test_writes_to_archived_ids_return_409(self):
+        responses = [
+            self.client.patch(f'/api/tasks/{self.done.id}/', {"title": "Otra"}, content_type='application/json'),
+            self.client.delete(f'/api/tasks/{self.done.id}/'),
+            self.client.post(f'/api/tasks/{self.done.id}/subtasks/', {"title": "Nueva"}, content_type='application/json'),
+            self.client.patch(f'/api/subtasks/{self.subtask.id}/', {"is_completed": False}, content_type='application/json'),
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [409] * 4)
+        self.assertEqual(ArchivedSubTask.objects.get(id=self.subtask.id).is_completed, True)
+
+    def test_non_owner_gets_403_before_archived_409(self):
+        other = User.objects.create(username='other', email='other@example.com')
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(other.id)}'}
+
+        responses = [
+            self.client.get(f'/api/tasks/{self.done.id}/', **auth),
+            self.client.post(f'/api/tasks/{self.done.id}/subtasks/', {"title": "Nueva"}, content_type='application/json', **auth),
+            self.client.patch(f'/api/subtasks/{self.subtask.id}/', {"is_completed": False}, content_type='application/json', **auth),
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [403] * 3)
+
+    def test_unknown_id_still_returns_404(self):
+        self.assertEqual(self.client.get(f'/api/tasks/{self.active.id + 100}/').status_code, 404)
+
+
+@override_settings(SUBTASK_GENERATOR='fake')
+class TaskImportExportTests(TestCase):
+    """Exportación e importación NDJSON de tareas"""
+
+    def setUp(self):
+        cache.clear()
+        local_profiles.clear()
+        self.owner = User.objects.create(username='owner', email='owner@example.com')
+        self.other = User.objects.create(username='other', email='other@example.com')
+
+    def line(self, **fields):
+        data = {"user": self.owner.id, "title": "Tarea importada", "description": "Descripción importada"}
+        data.update(fields)
+        return json.dumps(data)
+
+    def import_lines(self, lines, query='', **extra):
+        body = ''.join(f'{line}\n' for line in lines)
+        return self.client.post(f'/api/tasks/import/{query}', body, content_type='application/x-ndjson', **extra)
+
+    def test_reports_errors_per_line_and_imports_the_rest(self):
+        response = self.import_lines([
+            self.line(),
+            '{"user": ',
+            '[1, 2]',
+            self.line(user=self.other.id + 100),
+            self.line(description='x' * MAX_LINE_BYTES),
+            self.line(title='Otra tarea importada'),
+        ], query='?ai=skip')
+
+        summary = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((summary['imported'], summary['failed']), (2, 4))
+        self.assertEqual([e['line'] for e in summary['errors']], [2, 3, 4, 5])
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_only_errors_returns_400(self):
+        response = self.import_lines(['no es json'])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['failed'], 1)
+
+    def test_token_user_must_match_line_user(self):
+        token = issue_token(self.owner.id)
+
+        response = self.import_lines(
+            [self.line(user=self.other.id), json.dumps({"title": "Sin usuario", "description": "Toma el del token"})],
+            query='?ai=skip', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        summary = response.json()
+        self.assertEqual((summary['imported'], summary['failed']), (1, 1))
+        self.assertIn('user', summary['errors'][0]['errors'])
+        self.assertEqual(list(Task.objects.values_list('user_id', flat=True)), [self.owner.id])
+
+    def test_ai_defer_queues_tasks_without_subtasks(self):
+        response = self.import_lines([self.line(), self.line(title='Con subtareas', subtasks=[{"title": "Paso 1"}])])
+
+        self.assertEqual(response.json()['deferred'], 1)
+        pending = PendingSubtaskGeneration.objects.get()
+        self.assertEqual(pending.task.title, 'Tarea importada')
+
+        call_command('generate_subtasks', stdout=io.StringIO())
+
+        self.assertFalse(PendingSubtaskGeneration.objects.exists())
+        self.assertTrue(pending.task.subtasks.exists())
+
+    def failing_gemini_generator(self):
+        """SubtaskGenerator real cuyo chain.invoke falla (caída o cuota de Gemini)"""
+        from langchain_core.runnables import RunnableLambda
+
+        def unavailable(prompt):
+            raise RuntimeError('429 Resource has been exhausted')
+
+        generator = SubtaskGenerator.__new__(SubtaskGenerator)
+        generator.llm = RunnableLambda(unavailable)
+        return generator
+
+    def test_failed_generation_stays_queued(self):
+        self.import_lines([self.line()])
+
+        with mock.patch('tasks.signals.get_subtask_generator', return_value=self.failing_gemini_generator()), \
+                self.assertLogs('tasks', level='ERROR'):
+            call_command('generate_subtasks', stdout=io.StringIO())
+
+        self.assertEqual(PendingSubtaskGeneration.objects.count(), 1)
+        self.assertFalse(SubTasks.objects.exists())
+
+    def test_interactive_creation_keeps_default_subtasks_on_llm_error(self):
+        with mock.patch('tasks.signals.get_subtask_generator', return_value=self.failing_gemini_generator()), \
+                self.assertLogs('tasks.services', level='ERROR'):
+            task = Task.objects.create(user=self.owner, title='Tarea nueva', description='Descripción de la tarea')
+
+        self.assertEqual(task.subtasks.count(), 3)
+
+    def test_ai_skip_queues_nothing(self):
+        response = self.import_lines([self.line()], query='?ai=skip')
+
+        self.assertEqual((response.json()['imported'], response.json()['deferred']), (1, 0))
+        self.assertFalse(PendingSubtaskGeneration.objects.exists())
+
+    def test_batch_size_bounds(self):
+        for batch_size in ('0', str(MAX_BATCH_SIZE + 1), 'abc'):
+            with self.subTest(batch_size=batch_size):
+                response = self.import_lines([self.line()], query=f'?batch_size={batch_size}')
+                self.assertEqual(response.status_code, 400)
+
+        response = self.import_lines([self.line(), self.line(), self.line()], query='?batch_size=1&ai=skip')
+        self.assertEqual(response.json()['imported'], 3)
+
+    def test_export_import_round_trip(self):
+        first, second = Task.objects.bulk_create([
+            Task(user=self.owner, title='Primera tarea', description='Descripción de la primera', category='urgent'),
+            Task(user=self.other, title='Segunda tarea', description='Descripción de la segunda', status='is_completed'),
+        ])
+        SubTasks.objects.bulk_create([
+            SubTasks(task=first, title='Paso uno', is_completed=True),
+            SubTasks(task=first, title='Paso dos'),
+        ])
+
+        def exported():
+            response = self.client.get('/api/tasks/export/')
+            return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        def content(tasks):
+            return [
+                (t['user'], t['title'], t['description'], t['status'], t['category'],
+                 sorted((s['title'], s['is_completed']) for s in t['subtasks']))
+                for t in tasks
+            ]
+
+        before = exported()
+        Task.objects.all().delete()
+        response = self.import_lines([json.dumps(task) for task in before], query='?ai=skip')
+
+        self.assertEqual(response.json()['imported'], 2)
+        self.assertEqual(content(exported()), content(before))
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_DIR='')
+class ProfilingMiddlewareTests(TestCase):
+    """Perfil bajo demanda (?profile=...) y muestreo en segundo plano, solo para staff"""
+
+    def setUp(self):
+        self.staff = User.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.user = User.objects.create(username='owner', email='owner@example.com')
+        Task.objects.bulk_create([Task(user=self.user, title='Tarea', description='Descripción de la tarea')])
+        self.client.force_login(self.staff)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_middleware_is_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: None)
+
+    def test_non_staff_requests_are_not_profiled(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get('/api/tasks/?profile=text')
+
+        self.assertNotIn('X-Profiled-Status', response)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 1)
+
+    def test_text_report(self):
+        response = self.client.get('/api/tasks/', HTTP_X_PROFILE='text')
+
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        self.assertIn('cumulative', response.content.decode())
+
+    def test_pstats_output_loads_and_covers_streamed_body(self):
+        response = self.client.get('/api/tasks/?profile=pstats')
+
+        with tempfile.NamedTemporaryFile(suffix='.prof') as f:
+            f.write(response.content)
+            f.flush()
+            stats = pstats.Stats(f.name)
+        functions = {name for _, _, name in stats.stats}
+        self.assertIn('task_list', functions)
+        self.assertIn('iter_json_array', functions)
+
+    def test_collapsed_output_format(self):
+        response = self.client.get('/api/tasks/?profile=collapsed')
+
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        for line in response.content.decode().splitlines():
+            if line:
+                self.assertRegex(line, r'^\S.* \d+$')
+
+    def test_busy_cprofile_returns_409(self):
+        profiling.cprofile_lock.acquire()
+        try:
+            response = self.client.get('/api/tasks/?profile=text')
+        finally:
+            profiling.cprofile_lock.release()
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_profiling_dir_keeps_normal_response(self):
+        with tempfile.TemporaryDirectory() as output_dir, override_settings(PROFILING_DIR=output_dir):
+            self.client = self.client_class()
+            self.client.force_login(self.staff)
+
+            response = self.client.get('/api/tasks/?profile=text')
+
+            self.assertTrue(os.path.exists(response['X-Profile-File']))
+            self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 1)
+
+    def test_stacks_endpoint_is_staff_only_and_404_without_sampler(self):
+        self.assertIsNone(profiling.background_sampler)
+        self.assertEqual(self.client.get('/api/profiling/stacks/').status_code, 404)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/profiling/stacks/').status_code, 403)
+
+
+    @override_settings(PROFILING_SAMPLE_INTERVAL=0)
+    def test_background_sampler_covers_streamed_body(self):
+        seen = []
+
+        def body():
+            seen.append(threading.get_ident() in profiling.active_threads)
+            yield b'[]'
+
+        middleware = profiling.ProfilingMiddleware(lambda request: StreamingHttpResponse(body()))
+        with mock.patch.object(profiling, 'background_sampler', object()):
+            response = middleware(RequestFactory().get('/api/tasks/'))
+            self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+        self.assertEqual(seen, [True])
+        self.assertNotIn(threading.get_ident(), profiling.active_threads)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Negociación de Accept-Encoding y compresión de respuestas de la API"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.payload = json.dumps([{"title": f"Tarea {i}", "description": "x" * 50} for i in range(100)]).encode()
+
+    def respond(self, response, accept='gzip'):
+        middleware = compression.CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get('/api/tasks/', HTTP_ACCEPT_ENCODING=accept))
+
+    def test_accepted_encodings_skips_q0(self):
+        self.assertEqual(compression.accepted_encodings('gzip;q=0, zstd, br; q=0.5, deflate;q=0.0'), {'zstd', 'br'})
+
+    def test_prefers_zstd_then_gzip(self):
+        self.assertEqual(compression.choose_encoding('gzip, zstd'), 'zstd')
+        self.assertEqual(compression.choose_encoding('gzip, zstd;q=0'), 'gzip')
+        self.assertIsNone(compression.choose_encoding('br'))
+        with override_settings(COMPRESSION_ENCODINGS=['gzip', 'zstd']):
+            self.assertEqual(compression.choose_encoding('gzip, zstd'), 'gzip')
+
+    def test_small_responses_are_left_alone(self):
+        with override_settings(COMPRESSION_MIN_SIZE=len(self.payload) + 1):
+            response = self.respond(HttpResponse(self.payload, content_type='application/json'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(response.content, self.payload)
+
+    def test_compressed_body_decodes_to_original(self):
+        for accept, decompress in (('gzip', gzip.decompress), ('zstd', compression.zstandard.ZstdDecompressor().decompress)):
+            with self.subTest(accept=accept):
+                response = self.respond(HttpResponse(self.payload, content_type='application/json'), accept)
+
+                self.assertEqual(response['Content-Encoding'], accept)
+                self.assertEqual(response['Content-Length'], str(len(response.content)))
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(decompress(response.content), self.payload)
+
+    def test_streaming_body_is_compressed_without_content_length(self):
+        chunks = [self.payload[:1000], self.payload[1000:]]
+        streaming = StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson')
+        streaming['Content-Length'] = str(len(self.payload))
+
+        response = self.respond(streaming)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.payload)
+
+    def test_without_accept_encoding_only_vary_is_added(self):
+        response = self.respond(HttpResponse(self.payload, content_type='application/json'), accept='')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_html_is_never_compressed(self):
+        html = b'<input name="csrfmiddlewaretoken" value="secret">' * 100
+
+        response = self.respond(HttpResponse(html, content_type='text/html; charset=utf-8'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, html)
+
+
+class StreamedTaskListTests(TestCase):
+    """task_list se envía en varios trozos y se puede comprimir al vuelo"""
+
+    def setUp(self):
+        cache.clear()
+        local_profiles.clear()
+        user = User.objects.create(username='owner', email='owner@example.com')
+        Task.objects.bulk_create([
+            Task(user=user, title=f'Tarea {i}', description='Descripción larga ' * 40) for i in range(300)
+        ])
+
+    def test_list_is_streamed_in_several_chunks(self):
+        response = self.client.get('/api/tasks/')
+
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertGreaterEqual(len(chunks[0]), BUFFER_SIZE)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 300)
+
+    def test_compressed_list_decodes_to_the_same_tasks(self):
+        plain = json.loads(b''.join(self.client.get('/api/tasks/').streaming_content))
+
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(b''.join(response.streaming_content))), plain)
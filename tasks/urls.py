@@ -9,8 +9,15 @@ urlpatterns = [
     path('tasks/', views.task_list, name='task-list'),           # GET (listar), POST (crear)
     path('tasks/<int:task_id>/', views.task_detail, name='task-detail'),  # GET, PUT, PATCH, DELETE
 
+    # Importación/exportación masiva (NDJSON)
+    path('tasks/export/', views.task_export, name='task-export'),  # GET (streaming)
+    path('tasks/import/', views.task_import, name='task-import'),  # POST
+
     # CRUD de subtareas
-    path('tasks/<int:task_id>/subtasks/', views.subtask_create, name='subtask-create'),  # POST (crear)
+    path('tasks/<int:task_id>/subtasks/', views.task_subtasks, name='task-subtasks'),   # POST (crear), PATCH (masivo)
     path('subtasks/<int:subtask_id>/', views.subtask_detail, name='subtask-detail'),     # PATCH, DELETE
+
+    # Profiling (solo staff)
+    path('profiling/stacks/', views.profiling_stacks, name='profiling-stacks'),  # GET, DELETE
 ]
 
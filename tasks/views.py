@@ -1,10 +1,23 @@
+import io
+from itertools import chain
 from django.shortcuts import render
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view
-from .models import Task, SubTasks
-from .serielizers import TaskSerializer, SubTaskSerializer
+from .models import Task, SubTasks, ArchivedTask, ArchivedSubTask
+from .serielizers import (
+    TaskSerializer, SubTaskSerializer, SubTaskBulkUpdateSerializer, ArchivedTaskSerializer,
+    TaskExportSerializer
+)
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth.models import User
+from django.core import signing
+from django.db import transaction
+from django.db.models import BooleanField, Case, CharField, Count, F, Q, Value, When
+from django.utils import timezone
+from . import profiling
+from .auth import get_profile_by_email, get_token_user_id, issue_token
+from .streaming import iter_json_array, iter_ndjson, iter_serialized
+from .bulk import AI_MODES, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, import_ndjson
 
 
 # ==================== AUTH ====================
@@ -23,19 +36,34 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        user = User.objects.get(email=email)
-        return Response({
-            "id": user.id,
-            "email": user.email,
-            "username": user.username
-        }, status=status.HTTP_200_OK)
-    except User.DoesNotExist:
+    profile = get_profile_by_email(email)
+    if profile is None:
         return Response(
             {"error": "Usuario no encontrado con ese email"},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    return Response({
+        "id": profile['id'],
+        "email": profile['email'],
+        "username": profile['username'],
+        "token": issue_token(profile['id'])
+    }, status=status.HTTP_200_OK)
+
+
+def invalid_token_response():
+    return Response(
+        {"error": "Token inválido o expirado"},
+        status=status.HTTP_401_UNAUTHORIZED
+    )
+
+
+def archived_task_response():
+    return Response(
+        {"error": "La tarea está archivada y es de solo lectura"},
+        status=status.HTTP_409_CONFLICT
+    )
+
 
 # ==================== TASK CRUD ====================
 
@@ -44,29 +72,51 @@ def task_list(request):
     """
     GET: List all tasks filtered by user_id
     POST: Create a new task
-    Query params: ?user_id=1
+    Query params: ?user_id=1&include_archived=true
+    Con include_archived las tareas archivadas (con archived_at) van después de
+    todas las activas, cada grupo de la más reciente a la más antigua. Son de
+    solo lectura: task_detail las devuelve con GET y responde 409 al modificarlas.
     """
     if request.method == 'GET':
-        # Obtener user_id del query parameter
-        user_id = request.query_params.get('user_id', None)
+        # user_id del token si se envía, si no del query parameter
+        try:
+            user_id = get_token_user_id(request) or request.query_params.get('user_id', None)
+        except signing.BadSignature:
+            return invalid_token_response()
         
-        # Listar tareas
+        # Listar tareas (y las archivadas con ?include_archived=true)
+        include_archived = request.query_params.get('include_archived', '').lower() in ('true', '1')
+        tasks = Task.objects.all()
+        archived = ArchivedTask.objects.all()
         if user_id:
-            tasks = Task.objects.filter(user_id=user_id)
-        else:
-            tasks = Task.objects.all()
+            tasks = tasks.filter(user_id=user_id)
+            archived = archived.filter(user_id=user_id)
         
         # Si no hay tareas, devolver mensaje informativo
-        if not tasks.exists():
+        if not tasks.exists() and not (include_archived and archived.exists()):
             return Response({
                 "message": "No hay tareas disponibles",
                 "tasks": []
             }, status=status.HTTP_200_OK)
         
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Respuesta en streaming: nunca se construye la lista completa en memoria
+        items = iter_serialized(tasks.prefetch_related('subtasks'), TaskSerializer)
+        if include_archived:
+            items = chain(items, iter_serialized(archived.prefetch_related('subtasks'), ArchivedTaskSerializer))
+        return StreamingHttpResponse(iter_json_array(items), content_type='application/json')
     
     elif request.method == 'POST':
+        # Con token, solo se pueden crear tareas propias
+        try:
+            user_id = get_token_user_id(request)
+        except signing.BadSignature:
+            return invalid_token_response()
+        if user_id and 'user' in request.data and str(request.data['user']) != str(user_id):
+            return Response(
+                {"error": "No tienes permiso para crear tareas de otro usuario"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
         # Use TaskSerializer for creating (it handles the data properly)
         serializer = TaskSerializer(data=request.data)
         if serializer.is_valid():
@@ -85,20 +135,32 @@ def task_detail(request, task_id):
     PATCH: Update a task partially
     DELETE: Delete a task
     Query params: ?user_id=1 (opcional para verificar permisos)
+    Las tareas archivadas solo admiten GET (409 en el resto)
     """
     try:
         task = Task.objects.get(id=task_id)
     except Task.DoesNotExist:
-        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+        task = ArchivedTask.objects.filter(id=task_id).first()
+        if task is None:
+            return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
     
-    # Verificar permisos si se proporciona user_id
-    user_id = request.query_params.get('user_id', None)
-    if user_id and str(task.user_id) != user_id:
+    # Verificar permisos si se proporciona token o user_id
+    try:
+        user_id = get_token_user_id(request) or request.query_params.get('user_id', None)
+    except signing.BadSignature:
+        return invalid_token_response()
+    if user_id and str(task.user_id) != str(user_id):
         return Response(
             {"error": "No tienes permiso para acceder a esta tarea"}, 
             status=status.HTTP_403_FORBIDDEN
         )
     
+    if isinstance(task, ArchivedTask):
+        if request.method != 'GET':
+            return archived_task_response()
+        serializer = ArchivedTaskSerializer(task)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     if request.method == 'GET':
         serializer = TaskSerializer(task)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -118,26 +180,110 @@ def task_detail(request, task_id):
         )
 
 
-# ==================== SUBTASK CRUD ====================
+# ==================== BULK IMPORT/EXPORT ====================
+
+@api_view(['GET'])
+def task_export(request):
+    """
+    GET: Export tasks with their subtasks as NDJSON (one task per line), streamed
+    Query params: ?user_id=1
+    """
+    try:
+        user_id = get_token_user_id(request) or request.query_params.get('user_id', None)
+    except signing.BadSignature:
+        return invalid_token_response()
+
+    tasks = Task.objects.all()
+    if user_id:
+        tasks = tasks.filter(user_id=user_id)
+
+    # iterator(chunk_size) usa un cursor del lado del servidor en PostgreSQL: memoria constante
+    items = iter_serialized(tasks.order_by('id').prefetch_related('subtasks'), TaskExportSerializer)
+    response = StreamingHttpResponse(iter_ndjson(items), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="tasks.ndjson"'
+    return response
+
 
 @api_view(['POST'])
-def subtask_create(request, task_id):
+def task_import(request):
+    """
+    POST: Import tasks from an NDJSON body (same format as the export)
+    Query params: ?ai=defer|skip&batch_size=1000
+    ai=defer: tasks without subtasks are queued for generate_subtasks
+    ai=skip: tasks without subtasks are left without subtasks
+    """
+    ai = request.query_params.get('ai', 'defer')
+    if ai not in AI_MODES:
+        return Response(
+            {"error": f"ai debe ser uno de: {', '.join(AI_MODES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        batch_size = int(request.query_params.get('batch_size', DEFAULT_BATCH_SIZE))
+    except ValueError:
+        batch_size = 0
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        return Response(
+            {"error": f"batch_size debe estar entre 1 y {MAX_BATCH_SIZE}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        user_id = get_token_user_id(request)
+    except signing.BadSignature:
+        return invalid_token_response()
+
+    # Se lee el cuerpo línea a línea, sin cargarlo completo (no usar request.data)
+    stream = request.stream or io.BytesIO()
+    summary = import_ndjson(stream, ai=ai, batch_size=batch_size, user_id=user_id)
+
+    if summary['failed'] and not summary['imported']:
+        return Response(summary, status=status.HTTP_400_BAD_REQUEST)
+    return Response(summary, status=status.HTTP_200_OK)
+
+
+# ==================== SUBTASK CRUD ====================
+
+@api_view(['POST', 'PATCH'])
+def task_subtasks(request, task_id):
     """
     POST: Create a new subtask for a task
     Body: {"title": "My subtask", "is_completed": false}
+    PATCH: Update several subtasks of the task at once
+    Body: [{"id": 1, "is_completed": true}, {"id": 2, "title": "New title"}]
     """
+    tasks = Task.objects.all()
+    if request.method == 'PATCH':
+        # La actualización masiva solo necesita el dueño (POST serializa task_title)
+        tasks = tasks.only('id', 'user_id')
     try:
-        task = Task.objects.get(id=task_id)
+        task = tasks.get(id=task_id)
     except Task.DoesNotExist:
-        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+        # Archivada: se valida el dueño antes de responder 409
+        task = ArchivedTask.objects.only('id', 'user_id').filter(id=task_id).first()
+        if task is None:
+            return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
     # Validar que el usuario sea dueño de la tarea
-    user_id = request.data.get('user_id', None)
+    try:
+        user_id = get_token_user_id(request)
+    except signing.BadSignature:
+        return invalid_token_response()
+    if not user_id:
+        if isinstance(request.data, dict):
+            user_id = request.data.get('user_id', None)
+        else:
+            user_id = request.query_params.get('user_id', None)
     if user_id and str(task.user_id) != str(user_id):
         return Response(
-            {"error": "No tienes permiso para agregar subtareas a esta tarea"},
+            {"error": "No tienes permiso para modificar las subtareas de esta tarea"},
             status=status.HTTP_403_FORBIDDEN
         )
+    if isinstance(task, ArchivedTask):
+        return archived_task_response()
+
+    if request.method == 'PATCH':
+        return bulk_update_subtasks(request, task)
 
     title = request.data.get('title', '')
     is_completed = request.data.get('is_completed', False)
@@ -158,6 +304,47 @@ def subtask_create(request, task_id):
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+def bulk_update_subtasks(request, task):
+    """Apply all operations with a single CASE UPDATE and return the task progress"""
+    serializer = SubTaskBulkUpdateSerializer(data=request.data, many=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # Si un id se repite, se combinan sus campos (en conflicto gana la última operación)
+    operations = {}
+    for op in serializer.validated_data:
+        operations.setdefault(op['id'], {}).update(op)
+    cases = {}
+    for field, output_field in (('title', CharField()), ('is_completed', BooleanField())):
+        whens = [
+            When(id=subtask_id, then=Value(op[field], output_field=output_field))
+            for subtask_id, op in operations.items() if field in op
+        ]
+        if whens:
+            cases[field] = Case(*whens, default=F(field), output_field=output_field)
+
+    with transaction.atomic():
+        updated = SubTasks.objects.filter(task_id=task.id, id__in=operations).update(
+            updated_at=timezone.now(), **cases
+        )
+        if updated != len(operations):
+            transaction.set_rollback(True)
+            return Response(
+                {"error": "Alguna subtarea no existe o no pertenece a esta tarea"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    progress = SubTasks.objects.filter(task_id=task.id).aggregate(
+        subtasks_count=Count('id'),
+        completed_subtasks_count=Count('id', filter=Q(is_completed=True))
+    )
+    return Response({
+        "task": task.id,
+        "updated": updated,
+        **progress
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['PATCH', 'DELETE'])
 def subtask_detail(request, subtask_id):
     """
@@ -165,18 +352,38 @@ def subtask_detail(request, subtask_id):
     DELETE: Delete subtask
     """
     try:
-        subtask = SubTasks.objects.get(id=subtask_id)
+        # select_related: SubTaskSerializer lee task.title
+        subtask = SubTasks.objects.select_related('task').get(id=subtask_id)
     except SubTasks.DoesNotExist:
-        return Response({"error": "Subtask not found"}, status=status.HTTP_404_NOT_FOUND)
+        # Archivada: se valida el dueño antes de responder 409
+        subtask = ArchivedSubTask.objects.select_related('task').filter(id=subtask_id).first()
+        if subtask is None:
+            return Response({"error": "Subtask not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    # Validar con el token que el usuario sea dueño de la tarea
+    try:
+        user_id = get_token_user_id(request)
+    except signing.BadSignature:
+        return invalid_token_response()
+    if user_id and str(subtask.task.user_id) != str(user_id):
+        return Response(
+            {"error": "No tienes permiso para modificar esta subtarea"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if isinstance(subtask, ArchivedSubTask):
+        return archived_task_response()
 
     if request.method == 'PATCH':
-        # Actualizar campos proporcionados
+        # Actualizar solo los campos proporcionados
+        update_fields = ['updated_at']
         if 'title' in request.data:
             subtask.title = request.data['title']
+            update_fields.append('title')
         if 'is_completed' in request.data:
             subtask.is_completed = request.data['is_completed']
+            update_fields.append('is_completed')
 
-        subtask.save()
+        subtask.save(update_fields=update_fields)
         serializer = SubTaskSerializer(subtask)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -185,4 +392,33 @@ def subtask_detail(request, subtask_id):
         return Response(
             {"message": "Subtarea eliminada exitosamente"},
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+
+# ==================== PROFILING ====================
+
+@api_view(['GET', 'DELETE'])
+def profiling_stacks(request):
+    """
+    GET: Hot stacks aggregated by the background sampler (collapsed format)
+    DELETE: Reset the aggregated stacks
+    Solo para usuarios staff
+    """
+    if not request.user.is_staff:
+        return Response(
+            {"error": "No tienes permiso para ver el perfil"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    sampler = profiling.background_sampler
+    if sampler is None:
+        return Response(
+            {"error": "El muestreo en segundo plano no esta activo"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    if request.method == 'DELETE':
+        sampler.reset()
+        return Response({"message": "Perfil reiniciado"}, status=status.HTTP_200_OK)
+
+    return HttpResponse(sampler.collapsed(), content_type='text/plain')